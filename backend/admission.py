@@ -0,0 +1,133 @@
+# admission.py
+# Admission control with per-route bulkheads.
+#
+# Each bulkhead caps how many requests under a path prefix run at once and how many may
+# wait in a FIFO queue for a slot. When the queue is full, or a request waits longer than
+# the queue timeout, it is rejected immediately with 503 and a Retry-After header. This
+# stops a spike in expensive report generation from starving interactive chat.
+# Bulkheads are configured per router in backend/main.py.
+
+import math
+import time
+import asyncio
+from collections import deque
+
+from fastapi.responses import JSONResponse
+
+from backend.metrics import (ADMISSION_QUEUE_TIME, ADMISSION_REJECTED, BULKHEAD_ACTIVE, BULKHEAD_QUEUED)
+
+
+class Bulkhead:
+    """A concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(self, name, max_concurrent, max_queue=0, queue_timeout=10.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+        # Moving average of how long a request holds its slot, used for Retry-After
+        self._avg_service_time = 1.0
+
+    def _update_gauges(self):
+        BULKHEAD_ACTIVE.set(self.active, bulkhead=self.name)
+        BULKHEAD_QUEUED.set(len(self._waiters), bulkhead=self.name)
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up for a new request."""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self._avg_service_time * backlog / self.max_concurrent))
+
+    def _reject(self, reason):
+        ADMISSION_REJECTED.inc(bulkhead=self.name, reason=reason)
+        return False
+
+    async def acquire(self):
+        """Takes a slot, waiting in the queue if needed. Returns False if the request is rejected."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self._update_gauges()
+            ADMISSION_QUEUE_TIME.observe(0.0, bulkhead=self.name)
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # release() may have handed us the slot just as the timeout fired
+            if not (future.done() and not future.cancelled()):
+                return self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            # The client went away; give back a slot that was already handed to us
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            self._update_gauges()
+            ADMISSION_QUEUE_TIME.observe(time.perf_counter() - start, bulkhead=self.name)
+        return True
+
+    def release(self, service_time=None):
+        """Frees a slot, handing it straight to the longest-waiting request if there is one."""
+        if service_time is not None:
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware that admits each HTTP request through the bulkhead of its path prefix."""
+
+    def __init__(self, app, bulkheads):
+        self.app = app
+        # Longest prefix first, so "/api/listing/translate" can have its own bulkhead inside "/api/listing"
+        self.bulkheads = sorted(bulkheads.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _bulkhead_for(self, path):
+        for prefix, bulkhead in self.bulkheads:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return bulkhead
+        return None
+
+    async def __call__(self, scope, receive, send):
+        bulkhead = self._bulkhead_for(scope["path"]) if scope["type"] == "http" else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await bulkhead.acquire():
+            response = JSONResponse(
+                {"detail": "The server is busy right now. Please try again shortly."},
+                status_code=503,
+                headers={"Retry-After": str(bulkhead.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release(time.perf_counter() - start)
+
+
+def setup_admission_control(app, bulkheads):
+    """
+    Adds admission control to the FastAPI application.
+    `bulkheads` maps a path prefix (e.g. "/api/chat") to the Bulkhead that guards it.
+    """
+    app.add_middleware(AdmissionControlMiddleware, bulkheads=bulkheads)
@@ -0,0 +1,401 @@
+# cache.py
+# A small async cache abstraction shared by the chat, planner, trends and listing routers.
+#
+# Backends (selected with the CACHE_BACKEND environment variable):
+#   - "memory": per-process dictionary (default)
+#   - "sqlite": a local SQLite file (WAL + mmap) shared by every worker process on the host
+#   - "redis":  any server speaking the Redis protocol, at REDIS_URL
+#
+# Values are JSON-compatible objects, serialized with orjson (when available) and
+# zlib-compressed above a size threshold. `get_or_set` adds cache-stampede protection:
+# concurrent misses for the same key within a process share one computation, and
+# across processes a short-lived lock key ensures only one worker regenerates it.
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from backend.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+COMPRESS_THRESHOLD = 1024
+
+# Default lifetime of cached planner and trends reports, in seconds
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", str(6 * 60 * 60)))
+_RAW, _ZLIB = b"j", b"z"
+
+
+# --- Serialization ---
+def dumps(value):
+    """Serializes a JSON-compatible value to compact bytes with a one-byte format header."""
+    if orjson is not None:
+        payload = orjson.dumps(value)
+    else:
+        payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(payload) > COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(payload, 6)
+    return _RAW + payload
+
+
+def loads(data):
+    header, payload = data[:1], data[1:]
+    if header == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif header != _RAW:
+        raise ValueError(f"Unknown cache payload format {header!r}")
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+# --- Backends ---
+class MemoryBackend:
+    """In-process LRU cache. Fastest, but private to each worker."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def set(self, key, value, ttl):
+        self._data[key] = (value, time.time() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def add(self, key, value, ttl):
+        if self._live(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key):
+        self._data.pop(key, None)
+
+    async def close(self):
+        self._data.clear()
+
+
+class SQLiteBackend:
+    """A SQLite file shared by all worker processes on one host (WAL mode, memory-mapped reads)."""
+
+    def __init__(self, path, mmap_size=64 * 1024 * 1024):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+        self._writes = 0
+
+    def _run(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return cursor.fetchone(), cursor.rowcount
+
+    def _get(self, key):
+        row, _ = self._run("SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time()))
+        return row[0] if row else None
+
+    def _set(self, key, value, ttl):
+        self._run("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                  (key, value, time.time() + ttl))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._run("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def _add(self, key, value, ttl):
+        now = time.time()
+        # Insert, or take over the row only if it has expired; atomic across processes.
+        _, changed = self._run(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache.expires_at <= ?",
+            (key, value, now + ttl, now))
+        return changed == 1
+
+    def _delete(self, key):
+        self._run("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key, value, ttl):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def add(self, key, value, ttl):
+        return await asyncio.to_thread(self._add, key, value, ttl)
+
+    async def delete(self, key):
+        await asyncio.to_thread(self._delete, key)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisProtocolError(Exception):
+    pass
+
+
+class RedisBackend:
+    """Minimal asyncio client for servers speaking the Redis protocol (RESP2), with a small connection pool."""
+
+    def __init__(self, url, max_connections=20):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = (reader, writer)
+        if self.password:
+            await self._command(connection, "AUTH", self.password)
+        if self.db:
+            await self._command(connection, "SELECT", self.db)
+        return connection
+
+    @staticmethod
+    async def _read_reply(reader):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b"+":
+            return rest.decode()
+        if prefix == b"-":
+            raise RedisProtocolError(rest.decode())
+        if prefix == b":":
+            return int(rest)
+        if prefix == b"$":
+            length = int(rest)
+            if length == -1:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            return [await RedisBackend._read_reply(reader) for _ in range(int(rest))]
+        raise RedisProtocolError(f"Unexpected reply {line!r}")
+
+    async def _command(self, connection, *args):
+        reader, writer = connection
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        writer.write(b"".join(parts))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def execute(self, *args):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await self._command(connection, *args)
+            except BaseException:
+                # Including cancellation: a connection left mid-reply can't be reused
+                connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def get(self, key):
+        return await self.execute("GET", key)
+
+    async def set(self, key, value, ttl):
+        await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def add(self, key, value, ttl):
+        return await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)), "NX") == "OK"
+
+    async def delete(self, key):
+        await self.execute("DEL", key)
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+# --- Cache Front-End ---
+class Cache:
+    """Namespaced, serializing cache with TTLs and stampede-protected `get_or_set`."""
+
+    def __init__(self, backend, namespace="copilot", lock_ttl=60, lock_wait=30, poll_interval=0.05):
+        self.backend = backend
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self._inflight = {}
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    @staticmethod
+    def _metric_name(key):
+        # The first key segment names the cache for metrics, e.g. "planner:v2:delhi:2026-10-19" -> "planner"
+        return key.split(":", 1)[0]
+
+    async def get(self, key, default=None):
+        try:
+            data = await self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning("Cache get failed for %r: %s", key, e)
+            return default
+        return default if data is None else loads(data)
+
+    async def set(self, key, value, ttl):
+        try:
+            await self.backend.set(self._key(key), dumps(value), ttl)
+        except Exception as e:
+            logger.warning("Cache set failed for %r: %s", key, e)
+
+    async def add(self, key, value, ttl):
+        """Stores the value only if the key is absent; returns True when it was stored."""
+        try:
+            return await self.backend.add(self._key(key), dumps(value), ttl)
+        except Exception as e:
+            logger.warning("Cache add failed for %r: %s", key, e)
+            return True  # Fail open so callers are not blocked by a cache outage
+
+    async def delete(self, key):
+        try:
+            await self.backend.delete(self._key(key))
+        except Exception as e:
+            logger.warning("Cache delete failed for %r: %s", key, e)
+
+    async def get_or_set(self, key, factory, ttl):
+        """
+        Returns the cached value for `key`, or awaits `factory()` to compute, store and return it.
+        Only one caller per key regenerates a missing value; the others wait for its result.
+        """
+        value = await self.get(key)
+        record_cache_lookup(self._metric_name(key), value is not None)
+        if value is not None:
+            return value
+
+        # In-process single flight: concurrent callers share one computation. It runs in its own
+        # task, so a caller that is cancelled (a client disconnect, a cancelled prefetch) stops
+        # waiting without failing the others; the computation is only cancelled with its last waiter.
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(self._compute_with_lock(key, factory, ttl))
+            flight = self._inflight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _: self._end_flight(key, flight))
+        flight["waiters"] += 1
+        try:
+            return await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            if flight["waiters"] == 1 and not flight["task"].done():
+                # Forget it first, so a new caller starts a fresh computation instead of joining this one
+                self._end_flight(key, flight)
+                flight["task"].cancel()
+            raise
+        finally:
+            flight["waiters"] -= 1
+
+    def _end_flight(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def try_lock(self, key, token):
+        """
+        Takes the cross-process regeneration lock for `key`, as `get_or_set` does before computing
+        a value. Returns False if a `get_or_set` in this process or another holder is on it already.
+        """
+        if key in self._inflight:
+            return False
+        return await self.add(f"lock:{key}", token, self.lock_ttl)
+
+    async def unlock(self, key, token):
+        """Releases the regeneration lock for `key` if `token` still holds it."""
+        lock_key = f"lock:{key}"
+        if await self.get(lock_key) == token:
+            await self.delete(lock_key)
+
+    async def _compute_with_lock(self, key, factory, ttl):
+        # Cross-process lock: whichever worker adds the lock key regenerates the value
+        lock_key = f"lock:{key}"
+        token = secrets.token_hex(8)
+        if not await self.add(lock_key, token, self.lock_ttl):
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                value = await self.get(key)
+                if value is not None:
+                    return value
+                if await self.add(lock_key, token, self.lock_ttl):
+                    break
+            # If the other worker did not finish in time, compute anyway rather than fail the request
+        try:
+            # Another caller may have stored the value between our miss and taking the lock
+            value = await self.get(key)
+            if value is not None:
+                return value
+            value = await factory()
+            if value is not None:
+                await self.set(key, value, ttl)
+            return value
+        finally:
+            await self.unlock(key, token)
+
+    async def close(self):
+        await self.backend.close()
+
+
+# --- Configuration ---
+def create_backend(kind=None):
+    kind = (kind or os.getenv("CACHE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryBackend(int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    if kind == "sqlite":
+        path = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "copilot-cache.sqlite3"))
+        return SQLiteBackend(path)
+    if kind == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"))
+    raise ValueError(f"Unknown CACHE_BACKEND '{kind}'. Use 'memory', 'sqlite' or 'redis'.")
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the process-wide cache configured from the environment."""
+    global _cache
+    if _cache is None:
+        _cache = Cache(create_backend())
+    return _cache
@@ -0,0 +1,186 @@
+# cache_warmer.py
+# Pre-generates planner and trends reports for popular locations and categories so the
+# first seller of the day gets a cached report instead of waiting on the LLM.
+#
+# Reports are warmed shortly after startup (i.e. after each deploy) and daily at an
+# off-peak hour. The (location, category) pairs come from WARM_PAIRS plus the most
+# requested pairs seen in traffic, and each run stops once its token budget is spent.
+#
+# Run once by hand with: python -m backend.cache_warmer
+
+import os
+import time
+import logging
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+from backend.cache import get_cache
+from backend.metrics import CACHE_WARMER_REPORTS, meter_tokens
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Comma-separated "location:category" pairs that are always warmed, e.g. "Delhi:Kurtis,Surat:Sarees"
+WARM_PAIRS = os.getenv("WARM_PAIRS", "Delhi:Kurtis")
+# How many of the most requested traffic pairs are warmed in addition to WARM_PAIRS
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "5"))
+# Upper bound on LLM tokens (prompt + completion) spent by one warm-up run
+WARM_TOKEN_BUDGET = int(os.getenv("WARM_TOKEN_BUDGET", "50000"))
+# Local hour of the daily off-peak run, and the delay before the post-deploy run
+WARM_HOUR = int(os.getenv("WARM_HOUR", "4"))
+WARM_STARTUP_DELAY = float(os.getenv("WARM_STARTUP_DELAY", "30"))
+# Only one worker runs a warm-up within this window; the others skip it
+WARM_LOCK_TTL = 15 * 60
+# Request counts from each worker are merged into the shared cache at this interval
+TRAFFIC_FLUSH_INTERVAL = 10 * 60
+TRAFFIC_KEY = "warmer:traffic"
+TRAFFIC_TTL = 7 * 24 * 60 * 60
+# Category used for trends when only a location is known (matches the endpoint default)
+DEFAULT_CATEGORY = "Kurtis"
+# Token cost assumed for a report type until one has been generated and measured
+DEFAULT_REPORT_TOKENS = 3000
+
+_traffic = Counter()
+_report_tokens = {}
+
+
+# --- Traffic Tracking ---
+def _traffic_key(location, category=None):
+    return f"{location.strip().title()}|{(category or '').strip().title()}"
+
+def record_report_request(location, category=None):
+    """Counts a planner (no category) or trends (with category) request for popularity ranking."""
+    _traffic[_traffic_key(location, category)] += 1
+
+async def flush_traffic():
+    """Merges this worker's request counts into the shared cache so all workers rank pairs the same way."""
+    if not _traffic:
+        return
+    counts = Counter(await get_cache().get(TRAFFIC_KEY, {}))
+    counts.update(_traffic)
+    _traffic.clear()
+    # Keep the stored ranking small; the long tail is never warmed anyway
+    await get_cache().set(TRAFFIC_KEY, dict(counts.most_common(200)), TRAFFIC_TTL)
+
+def parse_pairs(value):
+    pairs = []
+    for item in value.split(","):
+        location, _, category = item.partition(":")
+        if location.strip():
+            pairs.append((location.strip(), category.strip() or DEFAULT_CATEGORY))
+    return pairs
+
+async def get_warm_pairs():
+    """Returns the configured pairs followed by the most requested ones, without duplicates."""
+    pairs = parse_pairs(WARM_PAIRS)
+    counts = Counter(await get_cache().get(TRAFFIC_KEY, {}))
+    counts.update(_traffic)
+
+    seen = {_traffic_key(*pair) for pair in pairs}
+    added = 0
+    for key, _ in counts.most_common():
+        if added >= WARM_TOP_N:
+            break
+        location, category = key.split("|", 1)
+        # Planner requests carry no category; their trends report is warmed for the default one
+        pair = (location, category or DEFAULT_CATEGORY)
+        if _traffic_key(*pair) not in seen:
+            seen.add(_traffic_key(*pair))
+            pairs.append(pair)
+            added += 1
+    return pairs
+
+
+# --- Warm-up ---
+def estimated_report_tokens(report):
+    """Tokens the last generation of this report type used, or DEFAULT_REPORT_TOKENS before the first."""
+    return _report_tokens.get(report, DEFAULT_REPORT_TOKENS)
+
+def record_report_tokens(report, used):
+    if used:
+        _report_tokens[report] = used
+
+def report_jobs(pairs):
+    """Yields (report, cache_key, build) for each planner location and trends pair."""
+    from backend.planner_routes import get_planner_report_entry, planner_cache_key
+    from backend.trends_routes import get_trends_report_entry, trends_cache_key
+
+    planned = set()
+    for location, category in pairs:
+        if location.lower() not in planned:
+            planned.add(location.lower())
+            yield "planner", planner_cache_key(location), \
+                lambda location=location: get_planner_report_entry(location)
+        yield "trends", trends_cache_key(location, category), \
+            lambda location=location, category=category: get_trends_report_entry(location, category)
+
+async def warm_reports(token_budget=WARM_TOKEN_BUDGET):
+    """Generates and caches every missing popular report until the token budget would be exceeded."""
+    cache = get_cache()
+    pairs = await get_warm_pairs()
+    spent = 0
+    start = time.perf_counter()
+    for report, key, build in report_jobs(pairs):
+        if await cache.get(key) is not None:
+            CACHE_WARMER_REPORTS.inc(report=report, outcome="cached")
+            continue
+        if spent + estimated_report_tokens(report) > token_budget:
+            CACHE_WARMER_REPORTS.inc(report=report, outcome="over_budget")
+            continue
+        try:
+            with meter_tokens() as meter:
+                await build()
+        except Exception as e:
+            logger.error("Cache warmer failed to generate %r: %s", key, e)
+            CACHE_WARMER_REPORTS.inc(report=report, outcome="error")
+            continue
+        used = meter["prompt"] + meter["completion"]
+        spent += used
+        record_report_tokens(report, used)
+        CACHE_WARMER_REPORTS.inc(report=report, outcome="warmed")
+
+    logger.info("Cache warm-up of %d pairs finished in %.1fs using %d of %d tokens",
+                len(pairs), time.perf_counter() - start, spent, token_budget)
+    return spent
+
+
+async def _warm_if_leader(reason):
+    # Every worker runs the scheduler, but only the one that takes the lock warms the cache
+    if not await get_cache().add("warmer:lock", os.getpid(), WARM_LOCK_TTL):
+        return
+    logger.info("Starting cache warm-up (%s)", reason)
+    try:
+        await warm_reports()
+    except Exception as e:
+        logger.exception("Cache warm-up failed: %s", e)
+
+
+# --- Scheduler ---
+def next_off_peak_run(now=None):
+    """Returns the next datetime at WARM_HOUR local time."""
+    now = now or datetime.now()
+    run = now.replace(hour=WARM_HOUR, minute=0, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+async def run_scheduler(on_startup=True):
+    """Warms the cache after startup and daily off-peak, flushing traffic counts in between."""
+    next_run = datetime.now() + timedelta(seconds=WARM_STARTUP_DELAY) if on_startup else next_off_peak_run()
+    reason = "startup" if on_startup else "off-peak"
+    try:
+        while True:
+            wait = (next_run - datetime.now()).total_seconds()
+            await asyncio.sleep(max(0.0, min(wait, TRAFFIC_FLUSH_INTERVAL)))
+            await flush_traffic()
+            if datetime.now() >= next_run:
+                await _warm_if_leader(reason)
+                next_run, reason = next_off_peak_run(), "off-peak"
+    finally:
+        await flush_traffic()
+
+
+if __name__ == "__main__":
+    from backend.logging_config import configure_logging
+
+    configure_logging()
+    asyncio.run(warm_reports())
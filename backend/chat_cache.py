@@ -0,0 +1,141 @@
+# chat_cache.py
+# Answer cache for history-free chat turns.
+#
+# Many chat questions are near-identical FAQs whose answer depends only on the query,
+# the reply language and the day's context (date, season, weather and festivals).
+# Answers are keyed by a normalized form of the query (case, punctuation, whitespace and
+# Devanagari transliterated to Latin script) plus the language and a hash of the context.
+# Optionally, a miss falls back to the most similar cached query (character trigram
+# similarity) when it scores above CHAT_CACHE_FUZZY_THRESHOLD.
+
+import os
+import re
+import hashlib
+import unicodedata
+
+from backend.cache import get_cache
+from backend.metrics import record_cache_lookup
+
+# --- Configuration ---
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "1") == "1"
+# The context hash already changes with the date and weather, so this mainly bounds storage
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", str(6 * 60 * 60)))
+# Trigram similarity (0-1) needed to reuse the answer of a different query; 0 disables fuzzy matching.
+# Keep it high (~0.9): 'festivals in march' and 'festivals in may' already score 0.82.
+CHAT_CACHE_FUZZY_THRESHOLD = float(os.getenv("CHAT_CACHE_FUZZY_THRESHOLD", "0"))
+# Queries remembered per (language, context) for fuzzy matching
+FUZZY_INDEX_SIZE = 256
+
+# --- Normalization ---
+_CONSONANTS = dict(zip(
+    "कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह",
+    ["k", "kh", "g", "gh", "n", "ch", "chh", "j", "jh", "n", "t", "th", "d", "dh", "n",
+     "t", "th", "d", "dh", "n", "p", "ph", "b", "bh", "m", "y", "r", "l", "v", "sh", "sh", "s", "h"],
+))
+_VOWELS = {"अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+           "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au"}
+_MATRAS = {"ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri",
+           "े": "e", "ै": "ai", "ो": "o", "ौ": "au"}
+_MARKS = {"ं": "n", "ँ": "n", "ः": "h"}
+_VIRAMA, _NUKTA = "्", "़"
+_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+# Romanized Hindi spells long vowels and v/w inconsistently ("tyohaar" / "tyohar", "diwali" / "divali")
+_SPELLING_VARIANTS = [("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"), ("w", "v")]
+_FILLERS = {"please", "pls", "plz", "kindly"}
+
+
+def transliterate_devanagari(text):
+    """Romanizes Devanagari text, e.g. 'त्योहार' -> 'tyohaar', dropping the word-final inherent 'a'."""
+    output = []
+    pending_a = False  # A consonant's inherent 'a' that a following matra or virama replaces
+    for char in text:
+        if char == _NUKTA:
+            continue  # Only modifies the previous consonant's sound
+        if char in _CONSONANTS:
+            if pending_a:
+                output.append("a")
+            output.append(_CONSONANTS[char])
+            pending_a = True
+            continue
+        if char in _MATRAS:
+            output.append(_MATRAS[char])
+        elif char in _MARKS or char in _VOWELS:
+            if pending_a:
+                output.append("a")
+            output.append(_MARKS.get(char) or _VOWELS[char])
+        elif char != _VIRAMA:
+            # Any other character ends the word, and Hindi drops a word-final inherent 'a'
+            output.append(_DIGITS.get(char, char))
+        pending_a = False
+    return "".join(output)
+
+
+def normalize_query(query):
+    """Reduces a query to a canonical form so trivially different phrasings share a cache key."""
+    text = transliterate_devanagari(unicodedata.normalize("NFKC", query)).lower()
+    for variant, canonical in _SPELLING_VARIANTS:
+        text = text.replace(variant, canonical)
+    words = re.sub(r"[^\w\s]|_", " ", text).split()
+    return " ".join(word for word in words if word not in _FILLERS)
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient of the character trigrams of two normalized queries."""
+    trigrams_a, trigrams_b = _trigrams(a), _trigrams(b)
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    return 2 * len(trigrams_a & trigrams_b) / (len(trigrams_a) + len(trigrams_b))
+
+
+def _digest(text, length):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
+
+
+# --- Lookup and Storage ---
+class ChatAnswerCache:
+    """Caches chat replies per (language, context snapshot, normalized query)."""
+
+    def __init__(self, language, context):
+        self.language = language.lower()
+        self.scope = f"{self.language}:{_digest(context, 16)}"
+        self.index_key = f"chat-index:{self.scope}"
+
+    def _answer_key(self, normalized):
+        return f"chat:{self.scope}:{_digest(normalized, 32)}"
+
+    async def get(self, query):
+        """Returns the cached reply for the query, or for a similar enough query, or None."""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        cache = get_cache()
+        answer = await cache.get(self._answer_key(normalized))
+        record_cache_lookup("chat", answer is not None)
+        if answer is not None or CHAT_CACHE_FUZZY_THRESHOLD <= 0:
+            return answer
+
+        best, best_score = None, CHAT_CACHE_FUZZY_THRESHOLD
+        for candidate in await cache.get(self.index_key, []):
+            score = similarity(normalized, candidate)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            answer = await cache.get(self._answer_key(best))
+        record_cache_lookup("chat_fuzzy", answer is not None)
+        return answer
+
+    async def set(self, query, answer):
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        cache = get_cache()
+        await cache.set(self._answer_key(normalized), answer, CHAT_CACHE_TTL)
+        if CHAT_CACHE_FUZZY_THRESHOLD > 0:
+            index = [entry for entry in await cache.get(self.index_key, []) if entry != normalized]
+            index.append(normalized)
+            await cache.set(self.index_key, index[-FUZZY_INDEX_SIZE:], CHAT_CACHE_TTL)
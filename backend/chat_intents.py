@@ -0,0 +1,318 @@
+# chat_intents.py
+# Local intent router for the chat assistant.
+#
+# Many chat questions ask for facts the backend already has: today's date, the season,
+# the weather, whether today is a festival, which festivals fall in the next N days or
+# in a named month, and on which date a named festival falls. These are matched with
+# keyword and pattern rules on the normalized query (see chat_cache.normalize_query,
+# which also romanizes Devanagari so Hindi and Hinglish share one set of rules). The
+# reply is rendered from English, Hindi or Hinglish templates without calling the LLM.
+# A query is only answered locally when every word in it belongs to a small calendar
+# vocabulary, so anything more ("best festival for jewellery", "festival discount
+# kitna dena chahiye") falls through to Groq.
+
+import os
+import re
+import logging
+import calendar
+from datetime import datetime, timedelta
+
+from backend.chat_cache import normalize_query
+from backend.utils import get_festivals_for_year
+from backend.metrics import CHAT_INTENTS
+
+logger = logging.getLogger(__name__)
+
+CHAT_INTENT_ROUTER = os.getenv("CHAT_INTENT_ROUTER", "1") == "1"
+# Longer queries are rarely purely factual, so they always go to the LLM
+MAX_QUERY_WORDS = 12
+DEFAULT_UPCOMING_DAYS = 30
+MAX_UPCOMING_DAYS = 365
+
+# --- Keyword Rules ---
+def _normalize_words(*phrases):
+    return {word for phrase in phrases for word in normalize_query(phrase).split()}
+
+def _keywords(*phrases):
+    """Joins phrases into a regex alternation, spelled the way normalize_query spells them."""
+    return "|".join(re.escape(normalize_query(phrase)) for phrase in phrases)
+
+_DATE = re.compile(r"\b(%s)\b" % _keywords("date", "what day", "tarikh", "dinank", "kaun sa din", "kya din"))
+_SEASON = re.compile(r"\b(%s)\b" % _keywords("season", "ritu"))
+_WEATHER = re.compile(r"\b(%s)\b" % _keywords("weather", "temperature", "mausam", "tapman"))
+_FESTIVAL_WORDS = ("festival", "festivals", "festive", "tyohaar", "tyohaaron", "utsav", "parv", "holiday", "holidays")
+_FESTIVAL = re.compile(r"\b(%s)\b" % _keywords(*_FESTIVAL_WORDS))
+_WHEN_WORDS = ("when", "kab", "date", "tarikh", "which day", "kis din")
+_WHEN = re.compile(r"\b(%s)\b" % _keywords(*_WHEN_WORDS))
+_TODAY_WORDS = ("today", "todays", "aaj", "abhi")
+_TODAY = re.compile(r"\b(%s)\b" % _keywords(*_TODAY_WORDS))
+# Asking for a list of festivals, as opposed to asking something about festivals
+_LIST_WORDS = ("which", "what", "whats", "list", "upcoming", "kaun se", "kaunse", "kon se", "konse", "kaun kaun")
+_LIST = re.compile(r"\b(%s)\b" % _keywords(*_LIST_WORDS))
+_NEXT = _keywords("next", "agle", "agale", "upcoming", "coming")
+_NEXT_DAYS = re.compile(r"\b(?:(?:%s)\s+)?(\d{1,3})\s+(?:%s)\b" % (_NEXT, _keywords("day", "days", "din")))
+_NEXT_WEEK = re.compile(r"\b(?:%s|is)\s+(?:%s)\b" % (_NEXT, _keywords("week", "hafte", "hafta", "saptah")))
+_MONTH_UNITS = _keywords("month", "mahine", "mahina")
+_THIS_MONTH = re.compile(r"\b(?:%s)\s+(?:%s)\b" % (_keywords("this", "is"), _MONTH_UNITS))
+_NEXT_MONTH = re.compile(r"\b(?:%s)\s+(?:%s)\b" % (_NEXT, _MONTH_UNITS))
+
+# Every word of a locally answered query must be one of these (or a month name or number);
+# anything else, such as a product, an offer or a "how", means the seller wants advice.
+_VOCABULARY = _normalize_words(
+    # English question and filler words
+    "a an the is are was will be it s there any all some of in on for from to at me my i we our you your",
+    "can could may would tell show give know list name names please",
+    "which what whats when upcoming coming next this these major main important big indian india hindu",
+    "date dates day days week weeks month months year current currently now right",
+    # Hindi and Hinglish
+    "kab hai hain ka ke ki ko me men mein mai se sa si kaun kon kaunse konse kya koi kis din dinank tarikh",
+    "mahine mahina hafte hafta saptah agle agale is saal batao bataiye bata dikhao",
+    "season ritu weather temperature mausam tapman", *_FESTIVAL_WORDS, *_TODAY_WORDS)
+# Words that only make sense for one intent, e.g. "how is the weather" but not "how to sell for Diwali"
+_INTENT_VOCABULARY = {"weather": _normalize_words("how hows kaisa kaisi")}
+# English names, abbreviations and the romanized Hindi spellings produced by normalize_query
+_MONTHS = {
+    1: ["january", "jan", "janvari", "janavari"],
+    2: ["february", "feb", "farvari", "faravari", "pharavari"],
+    3: ["march", "marc"],
+    4: ["april", "apr", "aprail", "aprel"],
+    5: ["may"],
+    6: ["june", "jun"],
+    7: ["july", "jul", "julai"],
+    8: ["august", "aug", "agast"],
+    9: ["september", "sep", "sept", "sitambar", "sitanbar"],
+    10: ["october", "oct", "aktubar"],
+    11: ["november", "nov", "navambar", "navanbar"],
+    12: ["december", "dec", "disambar", "disanbar"],
+}
+_MONTH_WORDS = {normalize_query(word): month for month, words in _MONTHS.items() for word in words}
+# Only festival months and festival dates are answered for a named year
+_YEAR = re.compile(r"\b(20\d\d)\b")
+# "may" is usually the verb ("may I know..."), so it is only the month after "in"/"of" or next to a day
+# number; "mai" alone usually means "I" in Hinglish, so May in Hindi (मई) only counts before "me"/"mein"
+_MAY = re.compile(r"\b(?:in|of|\d{1,2})\s+may\b|\bmay\s+\d{1,2}\b")
+_HINDI_MAY = re.compile(r"\bmai\s+(me|men|mein)\b")
+
+# --- Reply Templates ---
+HINDI_MONTHS = ["", "जनवरी", "फ़रवरी", "मार्च", "अप्रैल", "मई", "जून", "जुलाई", "अगस्त", "सितंबर", "अक्टूबर",
+                "नवंबर", "दिसंबर"]
+HINDI_WEEKDAYS = ["सोमवार", "मंगलवार", "बुधवार", "गुरुवार", "शुक्रवार", "शनिवार", "रविवार"]
+HINDI_SEASONS = {"Winter": "सर्दी", "Summer": "गर्मी", "Monsoon": "मानसून", "Post-Monsoon (Autumn)": "शरद ऋतु"}
+
+TEMPLATES = {
+    "english": {
+        "date": "Today is {date}.",
+        "season": "It is currently {season} in India.",
+        "weather": "Current weather in New Delhi: {description} with a temperature of {temp}°C. "
+                   "It is {season} in India right now.",
+        "no_weather": "Weather data is unavailable right now. It is {season} in India.",
+        "festival_today": "Yes, today is {festivals}.",
+        "no_festival_today": "There is no major festival today.",
+        "festivals": "Here are the festivals {period}:\n{festivals}",
+        "no_festivals": "There are no major festivals {period}.",
+        "festival_line": "- {name} on {date}",
+        "festival_date": "{name} is on {date}.",
+        "days": "in the next {days} days",
+        "month": "in {month} {year}",
+    },
+    "hindi": {
+        "date": "आज {date} है।",
+        "season": "भारत में अभी {season} का मौसम है।",
+        "weather": "नई दिल्ली में अभी मौसम: {description}, तापमान {temp}°C। भारत में अभी {season} का मौसम है।",
+        "no_weather": "अभी मौसम की जानकारी उपलब्ध नहीं है। भारत में अभी {season} का मौसम है।",
+        "festival_today": "हाँ, आज {festivals} है।",
+        "no_festival_today": "आज कोई बड़ा त्योहार नहीं है।",
+        "festivals": "{period} ये त्योहार हैं:\n{festivals}",
+        "no_festivals": "{period} कोई बड़ा त्योहार नहीं है।",
+        "festival_line": "- {name}: {date}",
+        "festival_date": "{name} {date} को है।",
+        "days": "अगले {days} दिनों में",
+        "month": "{month} {year} में",
+    },
+    "hinglish": {
+        "date": "Aaj {date} hai.",
+        "season": "India mein abhi {season} ka season hai.",
+        "weather": "New Delhi mein abhi {description} hai, temperature {temp}°C hai. "
+                   "India mein abhi {season} ka season hai.",
+        "no_weather": "Abhi weather ki jaankari available nahi hai. India mein abhi {season} ka season hai.",
+        "festival_today": "Haan, aaj {festivals} hai.",
+        "no_festival_today": "Aaj koi bada festival nahi hai.",
+        "festivals": "{period} ye festivals hain:\n{festivals}",
+        "no_festivals": "{period} koi bada festival nahi hai.",
+        "festival_line": "- {name}: {date}",
+        "festival_date": "{name} {date} ko hai.",
+        "days": "Agle {days} dinon mein",
+        "month": "{month} {year} mein",
+    },
+}
+
+
+# --- Classification ---
+def _find_month(query):
+    if _MAY.search(query) or _HINDI_MAY.search(query):
+        return 5
+    if _THIS_MONTH.search(query):
+        return datetime.now().month
+    if _NEXT_MONTH.search(query):
+        return datetime.now().month % 12 + 1
+    for word in query.split():
+        if word in _MONTH_WORDS and word != "may":
+            return _MONTH_WORDS[word]
+    return None
+
+def _find_days(query):
+    match = _NEXT_DAYS.search(query)
+    if match:
+        return min(MAX_UPCOMING_DAYS, max(1, int(match.group(1))))
+    return 7 if _NEXT_WEEK.search(query) else None
+
+def _find_year(query):
+    """The one year (e.g. 2027) the query names, or None if it names none or several."""
+    years = set(_YEAR.findall(query))
+    return int(years.pop()) if len(years) == 1 else None
+
+def _unknown_words(query, intent=None, year=None):
+    """
+    Words of the query outside the calendar vocabulary. Day numbers are known; a year is
+    only known when it is `year`, i.e. the intent uses it, so its answer is for that year.
+    """
+    known = _VOCABULARY | _INTENT_VOCABULARY.get(intent, set())
+    return [word for word in query.split() if word not in known and word not in _MONTH_WORDS
+            and not (word.isdigit() and (len(word) <= 3 or word == str(year)))]
+
+def classify_intent(query):
+    """
+    Returns (intent, params) for a purely factual calendar question, or None to use the LLM.
+    Intents: 'date', 'season', 'weather', 'festival_today', 'festivals_days', 'festivals_month'
+    and 'festival_date'.
+    """
+    normalized = normalize_query(query)
+    if not normalized or len(normalized.split()) > MAX_QUERY_WORDS:
+        return None
+
+    year = _find_year(normalized)
+    if _FESTIVAL.search(normalized):
+        if _unknown_words(normalized, year=year):
+            return None
+        month = _find_month(normalized)
+        if month:
+            return "festivals_month", {"month": month, "year": year}
+        if year:
+            return None  # A whole year's calendar is too long for a templated reply
+        if _TODAY.search(normalized):
+            return "festival_today", {}
+        days = _find_days(normalized)
+        if days or _LIST.search(normalized):
+            return "festivals_days", {"days": days or DEFAULT_UPCOMING_DAYS}
+        return None
+    if _WHEN.search(normalized) and not _TODAY.search(normalized):
+        # "When is Diwali?" is resolved against the festival data once it is loaded, using the
+        # words outside the vocabulary as the festival's name; a bare "what is the date?" is today's date
+        name = " ".join(_unknown_words(normalized, year=year))
+        if year and not name:
+            return None  # "What is the date in 2027?"
+        return "festival_date", {"name": name, "year": year, "is_date_question": bool(_DATE.search(normalized))}
+    for intent, pattern in (("weather", _WEATHER), ("season", _SEASON), ("date", _DATE)):
+        if pattern.search(normalized):
+            return None if _unknown_words(normalized, intent) else (intent, {})
+    return None
+
+
+# --- Rendering ---
+def format_date(date, language):
+    if language == "hindi":
+        return f"{HINDI_WEEKDAYS[date.weekday()]}, {date.day} {HINDI_MONTHS[date.month]} {date.year}"
+    return date.strftime("%A, %B %d, %Y")
+
+def _month_name(month, language):
+    return HINDI_MONTHS[month] if language == "hindi" else calendar.month_name[month]
+
+async def _festivals_between(start, end):
+    festivals = []
+    for year in range(start.year, end.year + 1):
+        for festival in await get_festivals_for_year(year):
+            date = datetime.strptime(festival["date"], "%Y-%m-%d")
+            if start.date() <= date.date() <= end.date():
+                festivals.append((date, festival["name"]))
+    return sorted(festivals)
+
+def _festival_list(festivals, language, templates):
+    return "\n".join(templates["festival_line"].format(name=name, date=format_date(date, language))
+                     for date, name in festivals)
+
+async def answer_intent(intent, params, language):
+    """Renders the reply for a classified intent, or returns None if the data can't answer it."""
+    from backend.chat_routes import get_current_season, get_current_weather
+
+    templates = TEMPLATES[language]
+    today = datetime.now()
+
+    if intent == "date":
+        return templates["date"].format(date=format_date(today, language))
+
+    if intent in ("season", "weather"):
+        season = get_current_season()
+        season = HINDI_SEASONS.get(season, season) if language == "hindi" else season
+        if intent == "season":
+            return templates["season"].format(season=season)
+        # OpenWeatherMap describes the weather in Hindi for Hindi replies; Hinglish keeps the English words
+        weather = await get_current_weather("hi" if language == "hindi" else "en")
+        if weather is None:
+            return templates["no_weather"].format(season=season)
+        return templates["weather"].format(season=season, **weather)
+
+    if intent == "festival_today":
+        names = [name for _, name in await _festivals_between(today, today)]
+        if not names:
+            return templates["no_festival_today"]
+        return templates["festival_today"].format(festivals=", ".join(names))
+
+    if intent == "festivals_days":
+        days = params["days"]
+        festivals = await _festivals_between(today, today + timedelta(days=days))
+        period = templates["days"].format(days=days)
+    elif intent == "festivals_month":
+        month, year = params["month"], params["year"]
+        if year is None:
+            # A month that has already passed this year means the coming one
+            year = today.year if month >= today.month else today.year + 1
+        start = datetime(year, month, 1)
+        end = datetime(year, month, calendar.monthrange(year, month)[1])
+        festivals = await _festivals_between(start, end)
+        period = templates["month"].format(month=_month_name(month, language), year=year)
+    elif intent == "festival_date":
+        if not params["name"]:
+            return templates["date"].format(date=format_date(today, language)) if params["is_date_question"] else None
+        wanted = f" {params['name']} "
+        if params["year"]:
+            candidates = await _festivals_between(datetime(params["year"], 1, 1), datetime(params["year"], 12, 31))
+        else:
+            candidates = await _festivals_between(today, today + timedelta(days=MAX_UPCOMING_DAYS))
+        for date, name in candidates:
+            # "diwali" matches "Diwali (Deepavali)", but "diwali sale" matches nothing
+            if wanted in f" {normalize_query(name)} ":
+                return templates["festival_date"].format(name=name, date=format_date(date, language))
+        return None  # Not a festival we know about; let the LLM handle it
+    else:
+        return None
+
+    if not festivals:
+        return templates["no_festivals"].format(period=period)
+    return templates["festivals"].format(period=period, festivals=_festival_list(festivals, language, templates))
+
+
+async def route_query(query, language):
+    """Answers a factual calendar question locally; returns None when the LLM should answer."""
+    language = language.lower() if language.lower() in TEMPLATES else "english"
+    intent = classify_intent(query)
+    if intent is None:
+        CHAT_INTENTS.inc(intent="llm")
+        return None
+    name, params = intent
+    try:
+        reply = await answer_intent(name, params, language)
+    except Exception as e:
+        logger.warning("Local intent %r failed, falling back to the LLM: %s", name, e)
+        reply = None
+    CHAT_INTENTS.inc(intent=name if reply else "llm")
+    return reply
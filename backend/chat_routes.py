@@ -1,20 +1,22 @@
 # chat_routes.py
 import os
+import json
+import asyncio
+import logging
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-import requests # Added for weather data
-import google.generativeai as genai
-from PIL import Image
 import io
 
 # --- Custom Utility Import ---
 from backend.utils import get_upcoming_festivals_for_chat
-
-# --- LangChain Imports ---
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from backend.metrics import record_llm_tokens
+from backend.circuit_breaker import upstream_call, service_unavailable, CircuitOpenError
+from backend.clients import get_chat_groq, get_gemini_model, generate_vision_content
+from backend.cache import get_cache
+from backend.chat_cache import ChatAnswerCache, CHAT_CACHE_ENABLED
+from backend.chat_intents import route_query, CHAT_INTENT_ROUTER
 
 # --- Configuration ---
 from dotenv import load_dotenv
@@ -22,66 +24,78 @@ load_dotenv()
 
 # --- Router Initialization ---
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # --- AI Model Configuration ---
-# Groq for fast text-only chat
-try:
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        raise KeyError("GROQ_API_KEY not found in .env file")
-    groq_model = ChatGroq(model='gemma2-9b-it')
-except Exception as e:
-    print(f"Error during Groq configuration in chat: {e}")
-    groq_model = None
-
-# Gemini for multimodal chat (image support)
-try:
-    google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
-        raise KeyError("GOOGLE_API_KEY not found in .env file")
-    genai.configure(api_key=google_api_key)
-    gemini_vision_model = genai.GenerativeModel('gemini-1.5-flash')
-except Exception as e:
-    print(f"Error during Gemini configuration in chat: {e}")
-    gemini_vision_model = None
+# Groq for fast text-only chat and Gemini for multimodal chat (image support).
+# Both clients are created on first use; see backend/clients.py.
 
 
 # --- Helper Functions ---
-def get_season_and_weather():
-    """Determines the current Indian season and fetches weather from OpenWeatherMap."""
-    api_key = os.getenv("OPENWEATHER_API_KEY")
-    if not api_key:
-        return "Weather data is unavailable.", "Season data is unavailable."
+# Weather is shared by every chat request, so a fetched summary is cached for a few minutes.
+WEATHER_CACHE_TTL = 10 * 60
+# Seconds to wait for OpenWeatherMap before answering without weather
+OPENWEATHER_TIMEOUT = float(os.getenv("OPENWEATHER_TIMEOUT", "5"))
 
-    # Determine season based on month
+
+def get_current_season():
+    """Determines the current Indian season based on the month."""
     month = datetime.now().month
     if month in [12, 1, 2]:
-        season = "Winter"
+        return "Winter"
     elif month in [3, 4, 5]:
-        season = "Summer"
+        return "Summer"
     elif month in [6, 7, 8, 9]:
-        season = "Monsoon"
+        return "Monsoon"
     else: # 10, 11
-        season = "Post-Monsoon (Autumn)"
-    
-    # Fetch weather for New Delhi, India
+        return "Post-Monsoon (Autumn)"
+
+
+def _fetch_weather(api_key, lang="en"):
+    """Fetches the current weather for New Delhi from OpenWeatherMap as {"description", "temp"}. Returns None on failure."""
+    import requests
     try:
         # Note: Using lat/lon is more reliable than city name
         lat, lon = 28.6139, 77.2090
-        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        response = requests.get(url)
-        response.raise_for_status() # Raise an exception for bad status codes
+        base_url = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org")
+        url = f"{base_url}/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric&lang={lang}"
+        with upstream_call("openweathermap"):
+            response = requests.get(url, timeout=OPENWEATHER_TIMEOUT)
+            response.raise_for_status() # Raise an exception for bad status codes
         data = response.json()
         
-        description = data['weather'][0]['description']
-        temp = data['main']['temp']
-        weather_summary = f"Current weather in New Delhi: {description} with a temperature of {temp}°C."
-        return season, weather_summary
+        return {"description": data['weather'][0]['description'], "temp": data['main']['temp']}
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching weather data: {e}")
-        return season, "Could not retrieve weather data."
+        logger.warning("Error fetching weather data: %s", e)
+        return None
     except KeyError:
-        return season, "Could not parse weather data."
+        logger.warning("Error parsing weather data.")
+        return None
+    except CircuitOpenError:
+        return None # OpenWeatherMap is failing; answer without weather until it recovers
+
+
+async def get_current_weather(lang="en"):
+    """Returns New Delhi's weather, described in `lang` (an OpenWeatherMap language code), or None."""
+    api_key = os.getenv("OPENWEATHER_API_KEY")
+    if not api_key:
+        return None
+
+    async def fetch():
+        return await asyncio.to_thread(_fetch_weather, api_key, lang)
+
+    return await get_cache().get_or_set(f"weather:new-delhi:{lang}", fetch, WEATHER_CACHE_TTL)
+
+
+async def get_season_and_weather():
+    """Determines the current Indian season and fetches weather from OpenWeatherMap."""
+    season = get_current_season()
+    if not os.getenv("OPENWEATHER_API_KEY"):
+        return season, "Weather data is unavailable."
+    weather = await get_current_weather()
+    if weather is None:
+        return season, "Could not retrieve weather data."
+    return season, f"Current weather in New Delhi: {weather['description']} with a temperature of {weather['temp']}°C."
 
 
 # --- Pydantic Models for Chat ---
@@ -103,12 +117,19 @@ async def chat_with_copilot_ai(
     history_str: str = Form("[]"), # History as a JSON string
     image: Optional[UploadFile] = File(None)
 ):
-    
+
+    # --- Local Intent Router ---
+    # Date, season, weather and festival-calendar questions are answered from local data without the LLM
+    if CHAT_INTENT_ROUTER and not image:
+        local_reply = await route_query(current_query, language)
+        if local_reply is not None:
+            return ChatResponse(reply=local_reply)
+
     # --- System Prompt and Context Setup ---
     now = datetime.now()
     current_date_str = now.strftime("%A, %B %d, %Y")
-    upcoming_festivals_str = get_upcoming_festivals_for_chat()
-    current_season, current_weather = get_season_and_weather()
+    upcoming_festivals_str = await get_upcoming_festivals_for_chat()
+    current_season, current_weather = await get_season_and_weather()
     
     if language.lower() == 'hindi':
         language_instruction = "You must respond only in Hindi."
@@ -136,26 +157,42 @@ async def chat_with_copilot_ai(
     4. If you do not know, state that you are unable to answer the question politely.
     """
 
+    # --- Answer Cache ---
+    # A history-free text turn depends only on the query, language and context, so its answer is reusable
+    answer_cache = None
+    if CHAT_CACHE_ENABLED and not image and history_str.strip() in ("", "[]"):
+        answer_cache = ChatAnswerCache(language, system_prompt)
+        cached_reply = await answer_cache.get(current_query)
+        if cached_reply is not None:
+            return ChatResponse(reply=cached_reply)
+
     # --- Model Invocation ---
+    groq_model = get_chat_groq()
+    gemini_vision_model = get_gemini_model()
     try:
         # --- Handle Image Input with Gemini ---
         if image and gemini_vision_model:
             if not image.content_type.startswith("image/"):
                 raise HTTPException(status_code=400, detail="Invalid file type. Only images are allowed.")
             
+            from PIL import Image
+
             image_content = await image.read()
             img = Image.open(io.BytesIO(image_content))
             
             # Gemini works with a list of content parts [text, image]
             prompt_parts = [current_query, img]
             
-            response = gemini_vision_model.generate_content(prompt_parts)
+            with upstream_call("gemini"):
+                response = await generate_vision_content(gemini_vision_model, prompt_parts)
+            record_llm_tokens("chat", response)
             ai_text = response.text
 
         # --- Handle Text-Only Input with Groq ---
         elif not image and groq_model:
+            from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
             # History needs to be parsed from the JSON string
-            import json
             history_list = json.loads(history_str)
             
             langchain_messages = [SystemMessage(content=system_prompt)]
@@ -170,8 +207,12 @@ async def chat_with_copilot_ai(
             
             langchain_messages.append(HumanMessage(content=current_query))
             
-            ai_response = groq_model.invoke(langchain_messages)
+            with upstream_call("groq"):
+                ai_response = await groq_model.ainvoke(langchain_messages)
+            record_llm_tokens("chat", ai_response)
             ai_text = ai_response.content if ai_response.content else "Sorry, I couldn't process that. Please try again."
+            if answer_cache and ai_response.content:
+                await answer_cache.set(current_query, ai_text)
 
         else:
             # Handle case where no model is available
@@ -179,8 +220,10 @@ async def chat_with_copilot_ai(
 
         return ChatResponse(reply=ai_text)
 
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"An error occurred in chat_with_copilot_ai: {e}")
+        logger.exception("An error occurred in chat_with_copilot_ai: %s", e)
         # Consider more specific error handling here
         raise HTTPException(status_code=500, detail=f"An error occurred while processing the AI request: {str(e)}")
 
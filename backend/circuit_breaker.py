@@ -0,0 +1,164 @@
+# circuit_breaker.py
+# Circuit breakers for the upstream services (astrosage, openweathermap, groq, gemini).
+#
+# Each breaker tracks the outcome of the last calls to its upstream. A call fails if it
+# raises or takes longer than the upstream's slow-call threshold. When the failure rate
+# over the window crosses the threshold, the circuit opens and calls fail immediately
+# with CircuitOpenError instead of waiting on a degraded service. Callers turn that into
+# a degraded default (no festival data, weather unavailable) or a 503 with Retry-After.
+# After `open_seconds` a single probe call is let through (half-open); if it succeeds
+# the circuit closes again, otherwise it stays open for another period. Every state
+# change starts a new window: calls admitted before it can still finish, but their
+# outcome no longer counts, so only the probe's own result decides a half-open circuit.
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from backend.metrics import CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_REJECTED, observe_upstream
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+# Exported as a gauge value per upstream
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"Circuit for '{upstream}' is open; retry in {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Failure-rate and latency based circuit breaker; safe to use from worker threads."""
+
+    def __init__(self, name, slow_call_seconds, failure_rate_threshold=0.5, window_size=20, min_calls=5,
+                 open_seconds=30.0, half_open_max_calls=1):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._outcomes = deque(maxlen=window_size)  # True for a successful, fast call
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._generation = 0  # Bumped on every state change; stale results are ignored
+        CIRCUIT_BREAKER_STATE.set(STATE_VALUES[CLOSED], upstream=name)
+
+    @property
+    def state(self):
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.log(logging.WARNING if state == OPEN else logging.INFO, "Circuit for %r is now %s",
+                       self.name, state, extra={"upstream": self.name})
+            self._generation += 1
+        self._state = state
+        CIRCUIT_BREAKER_STATE.set(STATE_VALUES[state], upstream=self.name)
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._set_state(OPEN)
+
+    def before_call(self):
+        """Admits a call and returns its ticket (window, is_probe) for `record` or `cancel`,
+        or raises CircuitOpenError if the circuit is open."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    CIRCUIT_BREAKER_REJECTED.inc(upstream=self.name)
+                    raise CircuitOpenError(self.name, max(1, round(remaining)))
+                self._probes = 0
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    CIRCUIT_BREAKER_REJECTED.inc(upstream=self.name)
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+                return self._generation, True
+            return self._generation, False
+
+    def record(self, ticket, success):
+        with self._lock:
+            generation, probe = ticket
+            if generation != self._generation:
+                # Admitted before the last state change, e.g. a slow call from the window
+                # that opened the circuit finishing while the probe is in flight
+                return
+            if self._state == HALF_OPEN:
+                if not probe:
+                    return
+                self._probes -= 1
+                if success:
+                    self._outcomes.clear()
+                    self._set_state(CLOSED)
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate_threshold:
+                self._open()
+
+    def cancel(self, ticket):
+        """Gives back a half-open probe slot for a call that was cancelled rather than failed."""
+        with self._lock:
+            generation, probe = ticket
+            if probe and generation == self._generation and self._state == HALF_OPEN:
+                self._probes -= 1
+
+    @contextmanager
+    def call(self):
+        ticket = self.before_call()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(ticket, False)
+            raise
+        except BaseException:
+            # Cancellation (e.g. the client disconnected) says nothing about the upstream's health
+            self.cancel(ticket)
+            raise
+        self.record(ticket, time.perf_counter() - start <= self.slow_call_seconds)
+
+
+# --- Upstream Breakers ---
+# Slow-call thresholds sit below each upstream's request timeout, so a hanging upstream
+# trips the breaker before every request has to wait out the full timeout.
+BREAKERS = {
+    "astrosage": CircuitBreaker("astrosage", slow_call_seconds=5.0, open_seconds=60.0),
+    "openweathermap": CircuitBreaker("openweathermap", slow_call_seconds=2.0, open_seconds=60.0),
+    "groq": CircuitBreaker("groq", slow_call_seconds=20.0),
+    "gemini": CircuitBreaker("gemini", slow_call_seconds=30.0),
+}
+
+
+@contextmanager
+def upstream_call(upstream):
+    """Guards a call to an upstream with its circuit breaker and records its latency."""
+    with BREAKERS[upstream].call(), observe_upstream(upstream):
+        yield
+
+
+def service_unavailable(error):
+    """The 503 response for a request whose required upstream has an open circuit."""
+    return HTTPException(
+        status_code=503,
+        detail=f"The {error.upstream} service is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(error.retry_after)},
+    )
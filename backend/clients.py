@@ -0,0 +1,153 @@
+# clients.py
+# Lazily constructed AI clients shared by the routers.
+# Heavy SDKs (LangChain, Groq, google.generativeai with gRPC/protobuf) are imported on
+# first use instead of at startup, so a cold instance can bind its port and answer
+# health checks before they are loaded. `warm_up` loads them in the background.
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Modules that dominate import time; loaded by `warm_up` after the server has started.
+HEAVY_MODULES = (
+    "google.generativeai",
+    "langchain_groq",
+    "langchain_core.prompts",
+    "langchain_core.output_parsers",
+    "langchain_core.messages",
+    "groq",
+    "PIL.Image",
+    "bs4",
+    "requests",
+)
+
+DEFAULT_GROQ_MODEL = "gemma2-9b-it"
+DEFAULT_GEMINI_MODEL = "gemini-1.5-flash"
+
+# Request timeouts (seconds) and retries, so a degraded LLM fails within a bounded time
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Passed to every Gemini generate_content call
+GEMINI_REQUEST_OPTIONS = {"timeout": GEMINI_TIMEOUT}
+
+_gemini_lock = threading.Lock()
+_gemini_configured = False
+
+
+# --- Groq ---
+@lru_cache(maxsize=None)
+def get_chat_groq(json_mode=False, temperature=None, model=DEFAULT_GROQ_MODEL):
+    """Returns a shared LangChain ChatGroq client, or None if Groq is not configured."""
+    try:
+        if not os.getenv("GROQ_API_KEY"):
+            raise KeyError("GROQ_API_KEY not found in .env file")
+        from langchain_groq import ChatGroq
+
+        kwargs = {"model": model, "timeout": GROQ_TIMEOUT, "max_retries": LLM_MAX_RETRIES}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        if json_mode:
+            kwargs["model_kwargs"] = {"response_format": {"type": "json_object"}}
+        return ChatGroq(**kwargs)
+    except Exception as e:
+        logger.error("Error during Groq configuration: %s", e)
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_groq_client():
+    """Returns a shared async Groq SDK client, or None if Groq is not configured."""
+    try:
+        from groq import AsyncGroq
+
+        return AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"), timeout=GROQ_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+    except Exception as e:
+        logger.error("Error during Groq client configuration: %s", e)
+        return None
+
+
+# --- Gemini ---
+def gemini_uses_rest():
+    """True when Gemini is pointed at GEMINI_API_ENDPOINT over the REST transport."""
+    return bool(os.getenv("GEMINI_API_ENDPOINT"))
+
+
+def _configure_gemini():
+    global _gemini_configured
+    with _gemini_lock:
+        if _gemini_configured:
+            return
+        import google.generativeai as genai
+
+        google_api_key = os.getenv("GOOGLE_API_KEY")
+        if not google_api_key:
+            raise KeyError("GOOGLE_API_KEY not found in .env file")
+        if gemini_uses_rest():
+            # Point the SDK at an alternative endpoint (e.g. a local stand-in for benchmarks)
+            genai.configure(api_key=google_api_key, transport="rest",
+                            client_options={"api_endpoint": os.environ["GEMINI_API_ENDPOINT"]})
+        else:
+            genai.configure(api_key=google_api_key)
+        _gemini_configured = True
+
+
+@lru_cache(maxsize=None)
+def get_gemini_model(model=DEFAULT_GEMINI_MODEL):
+    """Returns a shared Gemini GenerativeModel, or None if Gemini is not configured."""
+    try:
+        _configure_gemini()
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(model)
+    except Exception as e:
+        logger.error("Error during Gemini configuration: %s", e)
+        return None
+
+
+async def generate_vision_content(vision_model, prompt_parts, generation_config=None):
+    """Calls Gemini without blocking the event loop."""
+    # The REST transport used with GEMINI_API_ENDPOINT has no async client, so run it in a worker thread
+    if gemini_uses_rest():
+        return await asyncio.to_thread(vision_model.generate_content, prompt_parts,
+                                       generation_config=generation_config, request_options=GEMINI_REQUEST_OPTIONS)
+    return await vision_model.generate_content_async(prompt_parts, generation_config=generation_config,
+                                                     request_options=GEMINI_REQUEST_OPTIONS)
+
+
+# --- Warm-up ---
+def import_heavy_modules():
+    """Imports every heavy SDK and returns {module: seconds} for the ones that were not yet loaded."""
+    import importlib
+    import sys
+
+    timings = {}
+    for name in HEAVY_MODULES:
+        if name in sys.modules:
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Could not pre-import %s: %s", name, e)
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def warm_up():
+    """Loads the heavy SDKs and builds the shared clients so the first real request does not pay for it."""
+    start = time.perf_counter()
+    import_heavy_modules()
+    if os.getenv("GROQ_API_KEY"):
+        get_chat_groq()
+        get_chat_groq(json_mode=True)
+        get_groq_client()
+    if os.getenv("GOOGLE_API_KEY"):
+        get_gemini_model()
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
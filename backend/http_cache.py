@@ -0,0 +1,95 @@
+# http_cache.py
+# HTTP caching semantics (ETag, Last-Modified, Cache-Control) for cached JSON responses.
+#
+# A report is cached as an entry holding its serialized JSON body together with validators
+# derived from that body: a content-hash ETag and the time it was generated. Responses are
+# built straight from the entry, so a matching If-None-Match / If-Modified-Since request
+# gets 304 Not Modified without regenerating or re-serializing the report, and a normal
+# request skips response-model validation and serialization.
+
+import os
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+from backend.cache import get_cache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    import json
+
+# How long browsers and CDNs may reuse a report before revalidating it
+REPORT_HTTP_MAX_AGE = int(os.getenv("REPORT_HTTP_MAX_AGE", "300"))
+
+
+def report_max_age():
+    """REPORT_HTTP_MAX_AGE, cut short at midnight, when the reports' cache keys roll over."""
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(0, min(REPORT_HTTP_MAX_AGE, int((midnight - now).total_seconds())))
+
+
+def _serialize(payload):
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def make_entry(payload):
+    """Serializes a JSON-compatible payload into a cache entry with its HTTP validators."""
+    body = _serialize(payload)
+    return {
+        "body": body,
+        "etag": f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"',
+        "last_modified": format_datetime(datetime.now(timezone.utc).replace(microsecond=0), usegmt=True),
+    }
+
+
+async def get_or_create_entry(key, factory, ttl):
+    """Like Cache.get_or_set, but stores `await factory()` as a response entry (see make_entry)."""
+    async def build():
+        payload = await factory()
+        return None if payload is None else make_entry(payload)
+
+    return await get_cache().get_or_set(key, build, ttl)
+
+
+def _etag_matches(if_none_match, etag):
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since, last_modified):
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def entry_response(request: Request, entry, max_age=None):
+    """Returns the entry's body with validators, or 304 if the client's copy is still current."""
+    if max_age is None:
+        max_age = report_max_age()
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        not_modified = _etag_matches(if_none_match, entry["etag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, entry["last_modified"])
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
@@ -3,12 +3,22 @@
 #__author__ = "Sunny Arora"
 #__license__ = "MIT"
 
-from urllib.request import urlopen as uReq
-
-from bs4 import BeautifulSoup
 from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+import argparse
+import calendar
 import json
-import requests
+import logging
+import os
+
+from backend.circuit_breaker import upstream_call
+from backend.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the calendar page before giving up
+ASTROSAGE_TIMEOUT = float(os.getenv("ASTROSAGE_TIMEOUT", "10"))
 
 months_dict = ((1, "January"), (2, "February"), (3, "March"),
                (4, "April"), (5, "May"), (6, "June"),
@@ -23,11 +33,20 @@ class IndianFestivals(object):
     """
 
     def __init__(self, year: int):
+        # requests and BeautifulSoup are imported lazily to keep application startup fast
+        import requests
+        from bs4 import BeautifulSoup
+
+        self.year = int(year)
         # Parse below url to get all festivals and holidays info
-        page = f"https://panchang.astrosage.com/calendars/indiancalendar?language=en&date={year}"
-        reading = requests.get(page)
+        base_url = os.getenv("ASTROSAGE_BASE_URL", "https://panchang.astrosage.com")
+        page = f"{base_url}/calendars/indiancalendar?language=en&date={year}"
+        with upstream_call("astrosage"):
+            reading = requests.get(page, timeout=ASTROSAGE_TIMEOUT)
+            reading.raise_for_status()
         page = reading.text
-        soup = BeautifulSoup(page, 'html.parser')
+        with observe_stage("festivals", "parse_html"):
+            soup = BeautifulSoup(page, 'html.parser')
         self.festivals = soup.findChildren('table')
 
     def get_festivals_in_a_year(self, month=None):
@@ -83,6 +102,29 @@ class IndianFestivals(object):
 
         return json.dumps(festival_dict, indent=1)
 
+    def get_festival_dates(self):
+        """
+        Festivals in the year with full dates
+
+        Output:
+        List of {"name", "date" ('YYYY-MM-DD')} dictionaries, skipping malformed entries
+        type: List
+        """
+        month_map = {name: num for num, name in enumerate(calendar.month_name) if num}
+        festival_dates = []
+        for month_name, festivals in json.loads(self.get_festivals_in_a_year()).items():
+            month_number = month_map.get(month_name)
+            if not month_number:
+                continue
+            for festival in festivals:
+                try:
+                    festival_date = datetime(self.year, month_number, int(festival['date']))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                festival_dates.append({"name": festival.get('name', 'Unknown Festival'),
+                                       "date": festival_date.strftime('%Y-%m-%d')})
+        return festival_dates
+
     def get_festivals_in_a_month(self, month):
         """
         Festivals celebrated in a particular month of a year
@@ -223,10 +265,165 @@ class IndianFestivals(object):
         return festival_type
 
 
-if __name__ == "__main__":
+# --- Bundled Festival Snapshot ---
+# A precompiled copy of the scraped calendar for the next several years, so the app does
+# not depend on the site at runtime. Regenerate it with:
+#   python -m backend.local_festivals refresh --years 2026-2030
+# Where the site can't be reached, `--source holidays` builds it from the Government of
+# India holiday calendar in the `holidays` package (in requirements.txt) instead.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = os.getenv("FESTIVAL_SNAPSHOT_PATH",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "festivals.json"))
+# Recorded per year in the snapshot, as years can be refreshed from different sources
+SNAPSHOT_SOURCES = {
+    "astrosage": "https://panchang.astrosage.com/calendars/indiancalendar",
+    "holidays": "https://pypi.org/project/holidays/ (India: public, optional and government holidays)",
+}
+
+
+def _read_snapshot_file(path):
+    with open(path, encoding="utf-8") as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {snapshot.get('version')}")
+    return snapshot
+
+
+def _year_sources(snapshot):
+    # Snapshots written before sources were tracked per year have one file-wide source
+    default = {"source": snapshot.get("source"), "generated_at": snapshot.get("generated_at")}
+    sources = snapshot.get("sources", {})
+    return {int(year): sources.get(year, default) for year in snapshot["years"]}
+
+
+def _expand_years(snapshot):
+    # Entries are stored compactly as ["MM-DD", name] pairs per year
+    return {int(year): [{"name": name, "date": f"{year}-{month_day}"} for month_day, name in entries]
+            for year, entries in snapshot["years"].items()}
+
+
+@lru_cache(maxsize=None)
+def load_festival_snapshot(path=SNAPSHOT_PATH):
+    """
+    Festivals from the bundled snapshot, loaded once per process
+
+    Output:
+    {year: [{"name", "date" ('YYYY-MM-DD')}]} for every year the snapshot covers
+    type: Dict
+    """
+    try:
+        snapshot = _read_snapshot_file(path)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning("Ignoring festival snapshot at %s: %s", path, e)
+        return {}
+    return _expand_years(snapshot)
+
+
+def write_festival_snapshot(years_data, sources, path=SNAPSHOT_PATH):
+    """
+    Writes {year: [{"name", "date"}]} as a snapshot file, one year per line, with each
+    year's {"source", "generated_at"} from `sources`.
+    """
+    def block(lines):
+        return "\n" + ",\n".join(lines) + "\n" if lines else ""
+
+    years = sorted(years_data)
+    festival_lines = [f'  "{year}": {json.dumps([[festival["date"][5:], festival["name"]] for festival in years_data[year]], ensure_ascii=False)}'
+                      for year in years]
+    source_lines = [f'  "{year}": {json.dumps(sources[year])}' for year in years]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as snapshot_file:
+        snapshot_file.write(f'{{"version": {SNAPSHOT_VERSION}, "years": {{{block(festival_lines)}}}, '
+                            f'"sources": {{{block(source_lines)}}}}}\n')
+    load_festival_snapshot.cache_clear()
+
+
+def holiday_calendar_dates(year):
+    """
+    Festivals in the year from the `holidays` package's Government of India calendar
+
+    Output:
+    List of {"name", "date" ('YYYY-MM-DD')} dictionaries, one per festival
+    type: List
+    """
+    import holidays
+
+    india = holidays.India(years=int(year), categories=("public", "optional", "government"))
+    return [{"name": name, "date": day.strftime('%Y-%m-%d')}
+            for day in sorted(india) for name in india.get_list(day)]
+
+
+def refresh_festival_snapshot(years, path=SNAPSHOT_PATH, source="astrosage"):
+    """
+    Scrapes the given years (or, with source="holidays", reads them from the holidays
+    package) and merges them into the snapshot. Years that fail or come back empty keep
+    their previous data and source. Returns the years that were updated; the file is
+    only rewritten if there are any.
+    """
+    try:
+        snapshot = _read_snapshot_file(path)
+        years_data, sources = _expand_years(snapshot), _year_sources(snapshot)
+    except FileNotFoundError:
+        years_data, sources = {}, {}
+
+    updated = []
+    for year in years:
+        try:
+            if source == "holidays":
+                festivals = holiday_calendar_dates(year)
+            else:
+                festivals = IndianFestivals(year).get_festival_dates()
+        except Exception as e:
+            print(f"Could not scrape festivals for {year}: {e}")
+            continue
+        if not festivals:
+            print(f"No festivals found for {year}; keeping the previous snapshot data")
+            continue
+        years_data[year] = festivals
+        sources[year] = {"source": SNAPSHOT_SOURCES[source], "generated_at": f"{datetime.now():%Y-%m-%d}"}
+        updated.append(year)
+        print(f"{year}: {len(festivals)} festivals")
+
+    if updated:
+        write_festival_snapshot(years_data, sources, path)
+    return updated
+
+
+def _parse_years(value):
+    """Parses '2026-2030' or '2026,2028' into a list of years."""
+    years = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        years.extend(range(int(start), int(end or start) + 1))
+    return years
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indian festival calendar scraper and bundled snapshot tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh = subparsers.add_parser("refresh", help="Regenerate the bundled festival snapshot from the scraper.")
+    refresh.add_argument("--years", type=_parse_years, default=[datetime.now().year + i for i in range(5)],
+                         help="Years to scrape, e.g. 2026-2030 or 2026,2027 (default: this year and the next four).")
+    refresh.add_argument("--output", default=SNAPSHOT_PATH, help="Snapshot file to update.")
+    refresh.add_argument("--source", choices=tuple(SNAPSHOT_SOURCES), default="astrosage",
+                         help="Scrape astrosage (default), or use the holidays package's Government of India calendar.")
+
+    sample = subparsers.add_parser("sample", help="Print every festival listing for a year and month.")
+    sample.add_argument("--year", default="2022")
+    sample.add_argument("--month", type=int, default=2)
+
+    args = parser.parse_args(argv)
+    if args.command == "refresh":
+        updated = refresh_festival_snapshot(args.years, args.output, args.source)
+        print(f"Updated {len(updated)} of {len(args.years)} years in {args.output}"
+              + ("" if updated else "; the file was left unchanged"))
+        return
+
     # Sample Test Code
-    year = "2022"
-    month = 2
+    year, month = args.year, args.month
     fest = IndianFestivals(year)
 
     all_fests = fest.get_festivals_in_a_year()
@@ -247,4 +444,8 @@ if __name__ == "__main__":
     print("================================================")
     print("Religious Festivals in month %s for year %s: " %
           (dict(months_dict)[month], year))
-    print(fests_religious_month)
\ No newline at end of file
+    print(fests_religious_month)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# logging_config.py
+# Structured, non-blocking logging for the backend.
+#
+# Modules log through the standard library (`logger = logging.getLogger(__name__)`) under
+# the "backend" logger. Calls from request handlers only format the message and put the
+# record on a bounded in-memory queue; a background thread serializes records as one JSON
+# object per line and writes them to stdout, so a slow terminal or log shipper never blocks
+# the event loop. When the queue is full, records are dropped and counted.
+#
+# Every record carries the request ID and route of the request it was logged in (set by
+# RequestContextMiddleware, which also returns the ID in X-Request-ID), plus any `extra`
+# fields such as `upstream` and `latency_ms`. Warnings and errors are rate limited per
+# message template: the first LOG_ERROR_BURST in each LOG_ERROR_WINDOW are logged, then
+# only a LOG_ERROR_SAMPLE_RATE sample, so an upstream outage does not become a logging
+# storm. The next record that gets through reports how many were suppressed.
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from backend.metrics import LOG_RECORDS_DROPPED, route_template
+
+# --- Configuration ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", "10"))
+LOG_ERROR_WINDOW = float(os.getenv("LOG_ERROR_WINDOW", "60"))
+LOG_ERROR_SAMPLE_RATE = float(os.getenv("LOG_ERROR_SAMPLE_RATE", "0.01"))
+# Log one record per finished request with its status and latency
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "1") == "1"
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+_request_id = ContextVar("request_id", default=None)
+_route = ContextVar("route", default=None)
+_listener = None
+
+logger = logging.getLogger(__name__)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+# --- Formatting ---
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object, including its `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# --- Filters (run in the calling thread, before the record is queued) ---
+class RequestContextFilter(logging.Filter):
+    """Adds the current request's ID and route to the record."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.route = _route.get()
+        return True
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """Limits warnings and errors per (logger, message template) to a burst per window, then samples them."""
+
+    MAX_TEMPLATES = 1000
+
+    def __init__(self, burst=LOG_ERROR_BURST, window=LOG_ERROR_WINDOW, sample_rate=LOG_ERROR_SAMPLE_RATE):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_rate = sample_rate
+        self._templates = {}  # (logger, template) -> [window start, records in window, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._templates.get(key)
+            if state is None:
+                if len(self._templates) >= self.MAX_TEMPLATES:
+                    self._templates.clear()
+                state = self._templates[key] = [now, 0, 0]
+            elif now - state[0] >= self.window:
+                state[0], state[1] = now, 0
+            state[1] += 1
+            if state[1] <= self.burst or random.random() < self.sample_rate:
+                if state[2]:
+                    record.suppressed = state[2]
+                    state[2] = 0
+                return True
+            state[2] += 1
+        LOG_RECORDS_DROPPED.inc(reason="rate_limited")
+        return False
+
+
+# --- Queue ---
+class DroppingQueueHandler(QueueHandler):
+    """A QueueHandler that drops records when the queue is full instead of blocking or raising."""
+
+    def prepare(self, record):
+        # Resolve the message now, while its arguments are still current. Tracebacks (which
+        # read source files) and the JSON serialization are rendered on the listener thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+def configure_logging(level=LOG_LEVEL, stream=None):
+    """Routes the "backend" loggers through the queue to JSON lines on `stream` (stdout by default)."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(ErrorRateLimitFilter())
+
+    backend_logger = logging.getLogger("backend")
+    backend_logger.setLevel(level)
+    backend_logger.addHandler(handler)
+    backend_logger.propagate = False
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Writes out the queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# --- Request Context Middleware ---
+class RequestContextMiddleware:
+    """Pure ASGI middleware that assigns each request an ID and route for its log records."""
+
+    def __init__(self, app, fastapi_app):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        route = route_template(self.fastapi_app, scope)
+        request_id_token, route_token = _request_id.set(request_id), _route.set(route)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if LOG_REQUESTS and route != "/metrics":
+                logger.info("%s %s %s", scope["method"], scope["path"], status, extra={
+                    "method": scope["method"], "path": scope["path"], "status": status,
+                    "latency_ms": round((time.perf_counter() - start) * 1000, 1)})
+            _request_id.reset(request_id_token)
+            _route.reset(route_token)
+
+
+def setup_logging(app):
+    """Starts the logging pipeline and adds the request context middleware to the FastAPI application."""
+    configure_logging()
+    app.add_middleware(RequestContextMiddleware, fastapi_app=app)
@@ -1,29 +1,96 @@
 # Run with: uvicorn backend.main:app --host 0.0.0.0 --port 10000
 
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from backend.cors_config import setup_cors
+from backend.admission import Bulkhead, setup_admission_control
+from backend.metrics import setup_metrics
+from backend.profiling import setup_profiling, LoopLagMonitor
+from backend.logging_config import setup_logging, shutdown_logging
+from backend.clients import warm_up
+from backend.cache_warmer import run_scheduler
 
 # Corrected imports with full module path
 from backend.chat_routes import router as chat_router
-from planner_routes import router as planner_router
+from backend.planner_routes import router as planner_router
 from backend.trends_routes import router as trends_router
 from backend.product_listing_routes import router as product_listing_router
+from backend.session_routes import router as session_router, cancel_prefetches
+
+# --- Startup / Shutdown ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy SDKs are imported lazily. Load them in a background thread once startup
+    # completes so the port is bound immediately and the first request finds them ready.
+    warm_up_task = None
+    if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    # Log any synchronous call that blocks the event loop for longer than LOOP_LAG_THRESHOLD_MS
+    loop_lag_monitor = LoopLagMonitor().start() if os.getenv("LOOP_LAG_MONITOR", "1") == "1" else None
+    # Pre-generate popular planner/trends reports after each deploy and daily off-peak
+    cache_warmer_task = None
+    if os.getenv("CACHE_WARMER", "1") == "1":
+        cache_warmer_task = asyncio.create_task(run_scheduler())
+    yield
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+    if loop_lag_monitor:
+        loop_lag_monitor.stop()
+    if cache_warmer_task:
+        cache_warmer_task.cancel()
+        try:
+            await cache_warmer_task
+        except asyncio.CancelledError:
+            pass
+    await cancel_prefetches()
+    # Write out log records still queued for the writer thread
+    shutdown_logging()
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="Meesho Seller AI Co-pilot API",
     description="API endpoints for the AI Co-pilot, including chat and inventory planning.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+# --- Setup Admission Control ---
+# Per-router concurrency limits (bulkheads) with bounded wait queues, so expensive report
+# and listing generation cannot starve interactive chat. Requests beyond a full queue get
+# 503 with Retry-After. Added before CORS so rejections still carry CORS headers.
+setup_admission_control(app, {
+    "/api/chat": Bulkhead("chat", max_concurrent=64, max_queue=128, queue_timeout=5),
+    "/api/planner": Bulkhead("planner", max_concurrent=8, max_queue=16, queue_timeout=20),
+    "/api/trends": Bulkhead("trends", max_concurrent=8, max_queue=16, queue_timeout=20),
+    "/api/listing": Bulkhead("listing", max_concurrent=16, max_queue=32, queue_timeout=20),
+})
+
 # --- Setup CORS ---
 setup_cors(app)
 
+# --- Setup Metrics (/metrics) ---
+setup_metrics(app)
+
+# --- Setup On-demand Profiling ---
+# Outside admission control and metrics, so a profiled request's timeline includes admission
+# queueing and metrics.
+# Send "X-Profile: $PROFILE_ADMIN_TOKEN" or set PROFILE_SAMPLE_RATE to profile requests.
+setup_profiling(app)
+
+# --- Setup Structured Logging ---
+# Outermost, so every log record of a request, including admission rejections and
+# profiling output, carries its request ID (returned in X-Request-ID) and route.
+setup_logging(app)
+
 # --- Include Routers ---
 app.include_router(chat_router, prefix="/api/chat", tags=["AI Chat"])
 app.include_router(planner_router, prefix="/api/planner", tags=["Inventory Planner"])
 app.include_router(trends_router, prefix="/api/trends", tags=["Trends & Insights"])
 app.include_router(product_listing_router, prefix="/api/listing", tags=["Product Listing"])
+app.include_router(session_router, prefix="/api/session", tags=["Session"])
 
 # --- Root Endpoint for Health Check ---
 @app.get("/", tags=["Root"])
@@ -0,0 +1,348 @@
+# metrics.py
+# A small, dependency-free Prometheus metrics registry for the backend.
+# Exposes request latency, upstream latency, LLM token usage, cache hit ratios
+# and in-flight gauges in the Prometheus text exposition format at /metrics.
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# --- Metric Types ---
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted((key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                           for key, s in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- Backend Metrics ---
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route.", ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Number of HTTP requests currently being served.", ("route",))
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream services.", ("upstream", "outcome"))
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Prompt and completion tokens consumed, by endpoint.", ("endpoint", "kind"))
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio", "Fraction of cache lookups that were hits since process start.", ("cache",))
+PIPELINE_STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds", "Latency of individual pipeline stages.", ("pipeline", "stage"))
+ADMISSION_QUEUE_TIME = Histogram(
+    "admission_queue_seconds", "Time requests waited for a bulkhead slot.", ("bulkhead",))
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests rejected by admission control, by reason.", ("bulkhead", "reason"))
+BULKHEAD_ACTIVE = Gauge(
+    "bulkhead_active_requests", "Requests currently holding a bulkhead slot.", ("bulkhead",))
+BULKHEAD_QUEUED = Gauge(
+    "bulkhead_queued_requests", "Requests currently waiting for a bulkhead slot.", ("bulkhead",))
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).", ("upstream",))
+CIRCUIT_BREAKER_REJECTED = Counter(
+    "circuit_breaker_rejected_total", "Upstream calls failed fast because the circuit was open.", ("upstream",))
+CHAT_INTENTS = Counter(
+    "chat_intents_total", "Chat queries by locally answered intent, or 'llm' when Groq answered.", ("intent",))
+CACHE_WARMER_REPORTS = Counter(
+    "cache_warmer_reports_total", "Reports handled by the cache warmer, by outcome.", ("report", "outcome"))
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped by error-log rate limiting or a full log queue.", ("reason",))
+SESSION_PREFETCHES = Counter(
+    "session_prefetches_total", "Reports requested by session-start prefetch, by outcome.", ("report", "outcome"))
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late event loop heartbeats ran, i.e. how long the loop was blocked.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+# --- Instrumentation Helpers ---
+_token_meter = ContextVar("token_meter", default=None)
+_timeline = ContextVar("timeline", default=None)
+
+
+def record_span(name, start, duration):
+    """Adds a (name, start, duration) span to the current request's timeline, if one is being collected."""
+    timeline = _timeline.get()
+    if timeline is not None:
+        timeline.append((name, start, duration))
+
+
+@contextmanager
+def collect_timeline():
+    """Collects the upstream and stage spans recorded inside the block (including tasks and threads it starts)."""
+    timeline = []
+    reset_token = _timeline.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _timeline.reset(reset_token)
+
+
+@contextmanager
+def observe_upstream(upstream):
+    """Times a block that calls an upstream service (groq, gemini, astrosage, openweathermap)."""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except Exception as e:
+        outcome = "error"
+        logger.warning("Upstream call to %s failed: %s", upstream, type(e).__name__, extra={
+            "upstream": upstream, "latency_ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)})
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        UPSTREAM_REQUEST_DURATION.observe(duration, upstream=upstream, outcome=outcome)
+        record_span(f"upstream.{upstream}", start, duration)
+
+
+@contextmanager
+def observe_stage(pipeline, stage):
+    """Times one named stage of a multi-step pipeline, e.g. ('listing', 'vision')."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        PIPELINE_STAGE_DURATION.observe(duration, pipeline=pipeline, stage=stage)
+        record_span(f"{pipeline}.{stage}", start, duration)
+
+
+def record_cache_lookup(cache, hit):
+    """Counts a cache lookup and refreshes the cache's hit ratio gauge."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.get(cache=cache, result="hit")
+    misses = CACHE_REQUESTS.get(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
+
+
+def _extract_token_usage(response):
+    """Returns (prompt_tokens, completion_tokens) from a LangChain, Groq or Gemini response."""
+    # LangChain AIMessage
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict):
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    # Gemini GenerateContentResponse
+    if usage is not None and hasattr(usage, "prompt_token_count"):
+        return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+    # Groq / OpenAI-compatible ChatCompletion
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+    return 0, 0
+
+
+def record_llm_tokens(endpoint, response):
+    """Adds the token usage reported on an LLM response to the per-endpoint counters."""
+    prompt_tokens, completion_tokens = _extract_token_usage(response)
+    LLM_TOKENS.inc(prompt_tokens, endpoint=endpoint, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, endpoint=endpoint, kind="completion")
+    meter = _token_meter.get()
+    if meter is not None:
+        meter["prompt"] += prompt_tokens
+        meter["completion"] += completion_tokens
+    return prompt_tokens + completion_tokens
+
+
+@contextmanager
+def meter_tokens():
+    """
+    Tallies the LLM tokens recorded inside the block (including tasks it starts) into a
+    {"prompt", "completion"} dict, so background jobs can account for their own usage.
+    """
+    meter = {"prompt": 0, "completion": 0}
+    reset_token = _token_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _token_meter.reset(reset_token)
+
+
+# --- FastAPI Integration ---
+def route_template(app, scope):
+    """Resolves the matched route's path template so labels stay low-cardinality."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+def setup_metrics(app):
+    """
+    Adds request instrumentation middleware and the /metrics endpoint to the FastAPI application.
+    """
+    @app.middleware("http")
+    async def prometheus_middleware(request: Request, call_next):
+        route = route_template(app, request.scope)
+        if route == "/metrics":
+            return await call_next(request)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(route=route)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(route=route)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=request.method, route=route, status=status)
+
+    @app.get("/metrics", tags=["Root"], include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
@@ -1,18 +1,23 @@
 import os
 import json
+import logging
+import asyncio
+import secrets
 import calendar
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
-from typing import List, Optional
-
-# --- LangChain Imports ---
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from typing import Dict, List, Optional
 
 # --- Custom Utility Import ---
-from backend.local_festivals import get_upcoming_festivals_for_prompt
+from backend.utils import get_raw_upcoming_festivals
+from backend.metrics import observe_stage, record_llm_tokens
+from backend.circuit_breaker import upstream_call, service_unavailable, CircuitOpenError
+from backend.clients import get_chat_groq
+from backend.cache import get_cache, REPORT_CACHE_TTL
+from backend.http_cache import get_or_create_entry, entry_response, make_entry
+from backend.schema_prompt import get_format_instructions
+from backend.cache_warmer import record_report_request
 
 
 # --- Pydantic Models for Structured JSON Response ---
@@ -75,34 +80,139 @@ class PlannerResponse(BaseModel):
     avoidProducts: List[AvoidProduct]
     aiRecommendations: List[AIRecommendation] = Field(description="A list of specific, actionable AI recommendations.")
 
+# --- Models for the LLM's part of the plan ---
+# Festival names, dates, daysLeft, urgency, preparation and color come straight from the
+# festival calendar and are computed locally; the LLM only fills in the judgment fields.
+
+class FestivalStockingPlan(BaseModel):
+    name: str = Field(description="Name of the festival, copied exactly from the given list.")
+    items: List[str] = Field(description="List of recommended product categories to stock.")
+    expectedSales: str = Field(description="The expected sales volume, e.g., '₹50,000'.")
+
+class PlannerAIResponse(BaseModel):
+    festivalPlans: List[FestivalStockingPlan] = Field(description="One stocking plan per listed festival, in the same order.")
+    topProductsToStock: List[RecommendedProduct]
+    nearbyDemand: List[LocalDemand]
+    avoidProducts: List[AvoidProduct]
+    aiRecommendations: List[AIRecommendation] = Field(description="A list of specific, actionable AI recommendations.")
+
+# --- Models for batched generation (several locations per LLM call) ---
+class LocationPlan(BaseModel):
+    location: str = Field(description="The location this plan is for, copied exactly from the given list.")
+    plan: PlannerAIResponse
+
+class PlannerBatchAIResponse(BaseModel):
+    locationPlans: List[LocationPlan] = Field(description="One plan per listed location, in the same order.")
+
+class PlannerBatchRequest(BaseModel):
+    locations: List[str] = Field(min_length=1, max_length=50)
+
+class PlannerBatchResponse(BaseModel):
+    reports: Dict[str, PlannerResponse]
+    errors: Dict[str, str] = Field(default_factory=dict, description="Locations whose report failed, with the reason.")
+
+# --- Local Festival Fields ---
+FESTIVALS_IN_REPORT = 4
+
+# (max days left, urgency, preparation status), checked in order
+URGENCY_LEVELS = [
+    (14, "high", "Final Stocking"),
+    (45, "medium", "Sourcing Phase"),
+    (None, "low", "Planning Phase"),
+]
+
+FESTIVAL_COLORS = ["#F97316", "#8B5CF6", "#EC4899", "#10B981", "#3B82F6", "#EAB308"]
+
+def get_urgency(days_left: int):
+    """Maps days left until a festival to its (urgency, preparation) pair."""
+    for max_days, urgency, preparation in URGENCY_LEVELS:
+        if max_days is None or days_left <= max_days:
+            return urgency, preparation
+
+def build_festival_entries(upcoming_festivals):
+    """Builds the calendar-derived fields of each upcoming festival card."""
+    today = datetime.now().date()
+    entries = []
+    for index, festival in enumerate(upcoming_festivals[:FESTIVALS_IN_REPORT]):
+        festival_date = festival["date"].date()
+        days_left = (festival_date - today).days
+        urgency, preparation = get_urgency(days_left)
+        entries.append({
+            "id": index + 1,
+            "name": festival["name"],
+            "date": festival_date.strftime('%B %d, %Y'),
+            "daysLeft": days_left,
+            "urgency": urgency,
+            "preparation": preparation,
+            "color": FESTIVAL_COLORS[index % len(FESTIVAL_COLORS)],
+        })
+    return entries
+
+def merge_festival_plans(entries, plans):
+    """Combines local festival fields with the LLM's stocking plans, matching by name and then by position."""
+    plans_by_name = {plan.name.strip().lower(): plan for plan in plans}
+    festivals = []
+    for index, entry in enumerate(entries):
+        plan = plans_by_name.get(entry["name"].strip().lower())
+        if plan is None and index < len(plans):
+            plan = plans[index]
+        festivals.append(Festival(
+            **entry,
+            items=plan.items if plan else [],
+            expectedSales=plan.expectedSales if plan else "N/A",
+        ))
+    return festivals
+
 # --- Router Initialization ---
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # --- AI Model Configuration ---
-try:
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise KeyError("GROQ_API_KEY not found in .env file")
-    model = ChatGroq(model='gemma2-9b-it', model_kwargs={"response_format": {"type": "json_object"}})
-except Exception as e:
-    print(f"Error during Groq configuration in planner: {e}")
-    model = None
+# The JSON-mode Groq client is created on first use; see backend/clients.py.
 
 
-# --- API Endpoint for Inventory Planner ---
-@router.get("/full-report", response_model=PlannerResponse)
-async def get_full_planner_report(location: str = "Delhi"):
+# --- Report Generation ---
+async def get_festival_context(endpoint):
+    """Returns the upcoming festivals' local fields and their one-line summary for the prompt."""
+    with observe_stage(endpoint, "festivals"):
+        festival_entries = build_festival_entries(await get_raw_upcoming_festivals())
+    if festival_entries:
+        real_festivals = ", ".join(f"{entry['name']} ({entry['date']})" for entry in festival_entries)
+    else:
+        logger.warning("Could not fetch real-time festival data. The report will have no upcoming festivals.")
+        real_festivals = "No festivals listed."
+    return festival_entries, real_festivals
+
+def build_planner_response(festival_entries, ai_response: PlannerAIResponse) -> PlannerResponse:
+    return PlannerResponse(
+        upcomingFestivals=merge_festival_plans(festival_entries, ai_response.festivalPlans),
+        topProductsToStock=ai_response.topProductsToStock,
+        nearbyDemand=ai_response.nearbyDemand,
+        avoidProducts=ai_response.avoidProducts,
+        aiRecommendations=ai_response.aiRecommendations,
+    )
+
+def planner_cache_key(location: str) -> str:
+    # Festival dates and daysLeft change daily, so reports are keyed by date as well as location.
+    # "v2": the value is an HTTP cache entry (see http_cache.make_entry), not the bare report that
+    # older releases stored; bump it whenever the stored shape changes, as the cache may be persistent.
+    return f"planner:v2:{location.strip().lower()}:{datetime.now().date().isoformat()}"
+
+async def generate_planner_report(location: str) -> PlannerResponse:
+    """Generates a fresh inventory plan for a location with the LLM (uncached)."""
+    model = get_chat_groq(json_mode=True)
     if not model:
         raise HTTPException(status_code=500, detail="Groq API model is not configured.")
 
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+
     try:
-        # 1. Fetch real-time festival data using the new centralized utility function
-        real_festivals = get_upcoming_festivals_for_prompt()
-        if not real_festivals or "No major festivals" in real_festivals:
-            print("Warning: Could not fetch real-time festival data. The AI will generate festivals from its own knowledge.")
+        # 1. Fetch real-time festival data and compute the calendar-derived fields locally
+        festival_entries, real_festivals = await get_festival_context("planner")
 
         # 2. Set up the Pydantic Output Parser
-        parser = PydanticOutputParser(pydantic_object=PlannerResponse)
+        parser = PydanticOutputParser(pydantic_object=PlannerAIResponse)
 
         # 3. Create a prompt template that now includes the real festival data
         prompt_template = PromptTemplate(
@@ -113,45 +223,180 @@ async def get_full_planner_report(location: str = "Delhi"):
             Your task is to generate a complete inventory plan as a single, valid JSON object.
             The data should be realistic and relevant for a seller in {location}.
             
-            Here is a list of real, upcoming festivals in India: {real_festivals}
-            Please use this list as the primary source for the 'upcomingFestivals' section of your response.
-            Base the festival 'name' and 'date' fields directly on this list. The date format MUST be 'YYYY-MM-DD'.
-            If the list is empty, you can generate festivals based on your own knowledge.
+            Here are the upcoming festivals in India: {real_festivals}
+            For each of these festivals, in the same order, give the product categories to stock ('items')
+            and the 'expectedSales' in 'festivalPlans'. If no festivals are listed, return an empty 'festivalPlans' list.
 
-            Generate 4 upcoming festivals, 5 top products, 3 nearby demand areas, 3 products to avoid, and 5 AI-driven recommendations.
+            Generate 5 top products, 3 nearby demand areas, 3 products to avoid, and 5 AI-driven recommendations.
 
             {format_instructions}
             """,
             input_variables=["location", "real_festivals"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
+            partial_variables={"format_instructions": get_format_instructions(PlannerAIResponse)},
         )
 
-        # 4. Create the processing chain
-        chain = prompt_template | model | parser
-        
+        # 4. Create the processing chain (the parser runs separately so token usage can be recorded)
+        chain = prompt_template | model
+
         # 5. Invoke the chain with the query
-        response = await chain.ainvoke({"location": location, "real_festivals": real_festivals})
-        
-        # 6. Post-process the response to fix dates and calculate daysLeft accurately
-        today = datetime.now().date()
-        for festival in response.upcomingFestivals:
-            try:
-                # The AI provides the date as 'YYYY-MM-DD'. Parse it.
-                festival_date_obj = datetime.strptime(festival.date, '%Y-%m-%d').date()
-                
-                # Recalculate daysLeft for 100% accuracy
-                festival.daysLeft = (festival_date_obj - today).days
-                
-                # Reformat the date string to be more readable for the frontend
-                festival.date = festival_date_obj.strftime('%B %d, %Y')
-            except (ValueError, TypeError):
-                # If date parsing fails, leave the AI's original values to avoid a crash.
-                print(f"Could not parse date '{festival.date}' for festival '{festival.name}'. Using original AI values.")
-                continue
-
-        return response
+        with upstream_call("groq"):
+            ai_message = await chain.ainvoke({"location": location, "real_festivals": real_festivals})
+        record_llm_tokens("planner", ai_message)
+        with observe_stage("planner", "parse"):
+            ai_response = parser.parse(ai_message.content)
+
+        # 6. Combine the local festival fields with the AI's judgment fields
+        return build_planner_response(festival_entries, ai_response)
 
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"An error occurred in planner endpoint: {e}")
+        logger.exception("An error occurred in planner endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"An error occurred while generating the planner report: {e}")
 
+
+# --- Batched Generation ---
+# Locations per LLM call; bounded by the model's output limit (a plan is ~1.5k completion tokens)
+PLANNER_BATCH_SIZE = int(os.getenv("PLANNER_BATCH_SIZE", "3"))
+# LLM calls a single batch request runs at once
+PLANNER_BATCH_CONCURRENCY = int(os.getenv("PLANNER_BATCH_CONCURRENCY", "4"))
+
+def match_location_plans(locations, location_plans):
+    """Maps each requested location to its plan, matching by name and then by position."""
+    plans_by_name = {item.location.strip().lower(): item.plan for item in location_plans}
+    matched = {}
+    for index, location in enumerate(locations):
+        plan = plans_by_name.get(location.strip().lower())
+        if plan is None and len(location_plans) == len(locations):
+            plan = location_plans[index].plan
+        if plan is not None:
+            matched[location] = plan
+    return matched
+
+async def generate_planner_batch(locations: List[str], festival_entries, real_festivals) -> Dict[str, PlannerResponse]:
+    """
+    Generates the inventory plans of several locations in one LLM call that shares the
+    instructions and festival list (uncached). Locations missing from the reply are left out.
+    """
+    model = get_chat_groq(json_mode=True)
+    if not model:
+        raise HTTPException(status_code=500, detail="Groq API model is not configured.")
+
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    parser = PydanticOutputParser(pydantic_object=PlannerBatchAIResponse)
+    prompt_template = PromptTemplate(
+        template="""
+        You are an expert Indian retail and inventory planning AI for Meesho sellers.
+        Create a separate inventory plan for a seller in each of these locations: {locations}
+
+        Return a single, valid JSON object with one entry in 'locationPlans' per location, in the same order,
+        with 'location' copied exactly from the list. The data in each plan should be realistic and specific
+        to that location.
+
+        Here are the upcoming festivals in India: {real_festivals}
+        For each of these festivals, in the same order, give the product categories to stock ('items')
+        and the 'expectedSales' in each plan's 'festivalPlans'. If no festivals are listed, return an empty 'festivalPlans' list.
+
+        For each location, generate 5 top products, 3 nearby demand areas, 3 products to avoid, and 5 AI-driven recommendations.
+
+        {format_instructions}
+        """,
+        input_variables=["locations", "real_festivals"],
+        partial_variables={"format_instructions": get_format_instructions(PlannerBatchAIResponse)},
+    )
+    chain = prompt_template | model
+
+    with upstream_call("groq"):
+        ai_message = await chain.ainvoke({"locations": json.dumps(locations, ensure_ascii=False),
+                                          "real_festivals": real_festivals})
+    record_llm_tokens("planner_batch", ai_message)
+    with observe_stage("planner_batch", "parse"):
+        ai_response = parser.parse(ai_message.content)
+    plans = match_location_plans(locations, ai_response.locationPlans)
+    return {location: build_planner_response(festival_entries, plan) for location, plan in plans.items()}
+
+
+# --- API Endpoint for Inventory Planner ---
+async def get_planner_report_entry(location: str):
+    """Returns the cached response entry for a location's report, generating it on a miss."""
+    async def generate():
+        return (await generate_planner_report(location)).model_dump()
+
+    return await get_or_create_entry(planner_cache_key(location), generate, REPORT_CACHE_TTL)
+
+@router.get("/full-report", response_model=PlannerResponse)
+async def get_full_planner_report(request: Request, location: str = "Delhi"):
+    record_report_request(location)
+    return entry_response(request, await get_planner_report_entry(location))
+
+@router.post("/batch-report", response_model=PlannerBatchResponse)
+async def get_batch_planner_report(batch: PlannerBatchRequest):
+    """
+    Planner reports for many locations at once. Cached reports are returned as they are;
+    the rest are generated PLANNER_BATCH_SIZE locations per LLM call, with the calls running
+    concurrently. Locations a batch call fails to cover, or that are already being generated
+    elsewhere, are served through the single-location report path.
+    """
+    locations, seen = [], set()
+    for location in batch.locations:
+        location = location.strip()
+        if location and location.lower() not in seen:
+            seen.add(location.lower())
+            locations.append(location)
+    if not locations:
+        raise HTTPException(status_code=422, detail="At least one non-empty location is required.")
+    for location in locations:
+        record_report_request(location)
+
+    cache = get_cache()
+    entries = await asyncio.gather(*(cache.get(planner_cache_key(location)) for location in locations))
+    reports = {location: json.loads(entry["body"]) for location, entry in zip(locations, entries) if entry}
+    missing = [location for location in locations if location not in reports]
+    failures = {}
+
+    if missing:
+        festival_entries, real_festivals = await get_festival_context("planner_batch")
+        semaphore = asyncio.Semaphore(PLANNER_BATCH_CONCURRENCY)
+
+        async def run_batch(chunk):
+            # Take each location's regeneration lock first. A location that a single-report request,
+            # the cache warmer or another worker is already generating is left out of the batch and
+            # awaited through get_planner_report_entry below, instead of being generated twice.
+            token = secrets.token_hex(8)
+            locked = await asyncio.gather(*(cache.try_lock(planner_cache_key(location), token) for location in chunk))
+            claimed = [location for location, is_locked in zip(chunk, locked) if is_locked]
+            generated = {}
+            try:
+                if claimed:
+                    async with semaphore:
+                        try:
+                            generated = await generate_planner_batch(claimed, festival_entries, real_festivals)
+                        except Exception as e:
+                            logger.warning("Batched planner generation failed for %s, falling back to single reports: %s",
+                                           claimed, e)
+                for location, report in generated.items():
+                    report = report.model_dump()
+                    await cache.set(planner_cache_key(location), make_entry(report), REPORT_CACHE_TTL)
+                    reports[location] = report
+            finally:
+                await asyncio.gather(*(cache.unlock(planner_cache_key(location), token) for location in claimed))
+            for location in chunk:
+                if location in generated:
+                    continue
+                try:
+                    async with semaphore:
+                        reports[location] = json.loads((await get_planner_report_entry(location))["body"])
+                except HTTPException as e:
+                    failures[location] = e
+
+        chunks = [missing[i:i + PLANNER_BATCH_SIZE] for i in range(0, len(missing), PLANNER_BATCH_SIZE)]
+        await asyncio.gather(*(run_batch(chunk) for chunk in chunks))
+
+    if not reports:
+        raise next(iter(failures.values()))
+    return PlannerBatchResponse(
+        reports={location: reports[location] for location in locations if location in reports},
+        errors={location: str(e.detail) for location, e in failures.items()},
+    )
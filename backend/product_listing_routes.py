@@ -1,33 +1,33 @@
 import os
 import json
-import google.generativeai as genai
+import logging
+import hashlib
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from PIL import Image
+from pydantic import BaseModel, Field, create_model
+from typing import List, Literal, Optional
+from functools import lru_cache
 import io
 from dotenv import load_dotenv
-from groq import Groq
 import asyncio
 
-from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
-from langchain_core.output_parsers import PydanticOutputParser
+from backend.metrics import observe_stage, record_llm_tokens
+from backend.circuit_breaker import upstream_call, service_unavailable, CircuitOpenError
+from backend.clients import get_chat_groq, get_gemini_model, get_groq_client, generate_vision_content
+from backend.cache import get_cache
+from backend.schema_prompt import get_format_instructions
 
 load_dotenv()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # API Clients
-try:
-    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-except KeyError:
-    pass  # Handled in endpoint
+# Gemini and Groq clients are created on first use; see backend/clients.py.
 
-try:
-    groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-except KeyError:
-    groq_client = None
+# Listing generation mode, overridable per request with the `mode` form field:
+#   "two_stage":   Gemini describes the image, then Groq writes each content part from that text
+#   "single_pass": one multimodal Gemini call sees the image and writes every selected part
+LISTING_MODE = os.getenv("LISTING_MODE", "two_stage")
 
 
 # Main Pydantic Models for Structured Output
@@ -70,20 +70,82 @@ class TranslateResponse(BaseModel):
 
 async def generate_content_part(model, parser_class, prompt_template_str, input_data):
     """A reusable function to generate one part of the content."""
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+
     try:
         parser = PydanticOutputParser(pydantic_object=parser_class)
         prompt = PromptTemplate(
             template=prompt_template_str,
             input_variables=list(input_data.keys()),
-            partial_variables={"format_instructions": parser.get_format_instructions()},
+            partial_variables={"format_instructions": get_format_instructions(parser_class)},
         )
-        chain = prompt | model | parser
-        return await chain.ainvoke(input_data)
+        chain = prompt | model
+        with observe_stage("listing", parser_class.__name__), upstream_call("groq"):
+            ai_message = await chain.ainvoke(input_data)
+        record_llm_tokens("listing", ai_message)
+        with observe_stage("listing", f"{parser_class.__name__}.parse"):
+            return parser.parse(ai_message.content)
+    except CircuitOpenError:
+        raise # Groq is down, so the other parts would fail too; fail the request fast
     except Exception as e:
-        print(f"--- Failed to generate content for {parser_class.__name__} ---")
-        print(f"Error: {e}")
+        logger.warning("Failed to generate content for %s: %s", parser_class.__name__, e)
         return None # Return None on failure
 
+# --- Single-pass Generation ---
+# content option -> (GeneratedContent field, model, what to write)
+LISTING_PARTS = {
+    "seo": ("seo_content", SEOContent,
+            "SEO content in English, written as an expert SEO marketer for the Indian e-commerce market."),
+    "whatsapp": ("whatsapp_content", WhatsAppContent,
+                 "A WhatsApp caption and promotional message in English, written as a creative social media "
+                 "marketer for India. Use 1-2 relevant emojis."),
+    "conversational": ("conversational_content", ConversationalContent,
+                       "3-5 natural language search phrases in English that a real person in India would use "
+                       "to find this product."),
+}
+
+SINGLE_PASS_PROMPT = """You are an expert e-commerce copywriter for sellers in India.
+Look carefully at the product image (color, material, style, design and notable features) and read the
+seller's description, then write the following listing content:
+{tasks}
+Seller's Description: "{user_description}"
+Category: "{category}"
+{format_instructions}"""
+
+@lru_cache(maxsize=None)
+def single_pass_model(parts):
+    """The combined output model for a tuple of selected content options, e.g. ('seo', 'whatsapp')."""
+    fields = {}
+    for part in parts:
+        name, model, _ = LISTING_PARTS[part]
+        fields[name] = (model, Field(description=GeneratedContent.model_fields[name].description))
+    return create_model("ListingContent", **fields)
+
+async def generate_single_pass_listing(vision_model, pil_image, description, category, content_options):
+    """Writes every selected content part in one multimodal Gemini call."""
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    parts = tuple(part for part in LISTING_PARTS if content_options.get(part))
+    if not parts:
+        raise HTTPException(status_code=500, detail="AI failed to generate any content. Please try again.")
+    output_model = single_pass_model(parts)
+    parser = PydanticOutputParser(pydantic_object=output_model)
+    prompt = SINGLE_PASS_PROMPT.format(
+        tasks="\n".join(f"- '{LISTING_PARTS[part][0]}': {LISTING_PARTS[part][2]}" for part in parts),
+        user_description=description,
+        category=category,
+        format_instructions=get_format_instructions(output_model),
+    )
+    with observe_stage("listing", "single_pass"), upstream_call("gemini"):
+        response = await generate_vision_content(
+            vision_model, [prompt, pil_image],
+            generation_config={"response_mime_type": "application/json", "temperature": 0.4})
+    record_llm_tokens("listing", response)
+    with observe_stage("listing", "single_pass.parse"):
+        content = parser.parse(response.text)
+    return GeneratedContent(category=category, **content.model_dump())
+
 # --- Main Endpoint ---
 @router.post("/")
 async def generate_listing_endpoint(
@@ -91,36 +153,60 @@ async def generate_listing_endpoint(
     category: str = Form(...),
     # dialect: str = Form("english"), # Removed
     content_options_str: str = Form('{"seo": true}'),
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    mode: Literal["two_stage", "single_pass"] = Form(LISTING_MODE),
 ):
     if "GOOGLE_API_KEY" not in os.environ or not os.environ["GOOGLE_API_KEY"]:
         raise HTTPException(status_code=500, detail="Google API key is not configured.")
 
-    # Step 1: Analyze the image with Gemini Vision to get a description
     try:
+        from PIL import Image
+
         image_bytes = await image.read()
-        pil_image = Image.open(io.BytesIO(image_bytes))
-        
-        vision_model = genai.GenerativeModel('gemini-1.5-flash')
+        with observe_stage("listing", "decode_image"):
+            pil_image = Image.open(io.BytesIO(image_bytes))
+            pil_image.load()
+
+        vision_model = get_gemini_model()
+        if vision_model is None:
+            raise RuntimeError("Gemini model is not configured.")
+    except Exception as e:
+        logger.exception("Error while preparing the product image: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to analyze product image.")
+
+    if mode == "single_pass":
+        try:
+            return await generate_single_pass_listing(
+                vision_model, pil_image, description, category, json.loads(content_options_str))
+        except HTTPException:
+            raise
+        except CircuitOpenError as e:
+            raise service_unavailable(e)
+        except Exception as e:
+            logger.exception("Error in single-pass listing generation: %s", e)
+            raise HTTPException(status_code=500, detail="Failed to generate listing content.")
+
+    # Step 1: Analyze the image with Gemini Vision to get a description
+    try:
         image_analysis_prompt = [
             "You are an expert at analyzing product images. Describe the product in the image in detail, "
             "focusing on its visual attributes like color, material, style, design, and any notable features. "
             "This description will be used by another AI to generate a product listing. Be objective and descriptive.",
             pil_image
         ]
-        vision_response = await vision_model.generate_content_async(image_analysis_prompt)
+        with observe_stage("listing", "vision"), upstream_call("gemini"):
+            vision_response = await generate_vision_content(vision_model, image_analysis_prompt)
+        record_llm_tokens("listing", vision_response)
         image_description = vision_response.text
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"Error during image analysis with Gemini: {e}")
+        logger.exception("Error during image analysis with Gemini: %s", e)
         raise HTTPException(status_code=500, detail="Failed to analyze product image.")
 
     # --- Step 2: Concurrently generate all selected content types ---
     try:
-        groq_model = ChatGroq(
-            model="gemma2-9b-it",
-            temperature=0.4, # Slightly increased for more creative output
-            model_kwargs={"response_format": {"type": "json_object"}}
-        )
+        groq_model = get_chat_groq(json_mode=True, temperature=0.4) # Slightly increased for more creative output
         content_options = json.loads(content_options_str)
         
         tasks = []
@@ -180,47 +266,54 @@ async def generate_listing_endpoint(
 
         return final_content
 
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"Error in main generation logic: {e}")
+        logger.exception("Error in main generation logic: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate listing content from text.")
 
 # --- Other Endpoints ---
 @router.post("/improve", response_model=GeneratedContent)
 async def improve_listing_endpoint(request: ImproveListingRequest):
+    groq_client = get_groq_client()
     if not groq_client:
         raise HTTPException(status_code=500, detail="Groq API key not configured.")
     try:
         # Convert the Pydantic object to a JSON string for the prompt
         content_json_str = request.content.json()
 
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert e-commerce copywriter. Your task is to improve the provided JSON product content. "
-                        "Make titles more catchy, descriptions more persuasive, and conversational phrases more natural. "
-                        "Do not alter the JSON structure or keys. Respond ONLY with the improved, valid JSON object."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Improve this product content: {content_json_str}"
-                }
-            ],
-            model="gemma2-9b-it",
-            temperature=0.7,
-            response_format={"type": "json_object"},
-        )
+        with upstream_call("groq"):
+            chat_completion = await groq_client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are an expert e-commerce copywriter. Your task is to improve the provided JSON product content. "
+                            "Make titles more catchy, descriptions more persuasive, and conversational phrases more natural. "
+                            "Do not alter the JSON structure or keys. Respond ONLY with the improved, valid JSON object."
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Improve this product content: {content_json_str}"
+                    }
+                ],
+                model="gemma2-9b-it",
+                temperature=0.7,
+                response_format={"type": "json_object"},
+            )
+        record_llm_tokens("listing_improve", chat_completion)
         return GeneratedContent.parse_raw(chat_completion.choices[0].message.content)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"Error calling Groq API or parsing response for improvement: {e}")
+        logger.exception("Error calling Groq API or parsing response for improvement: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to improve listing: {e}")
 
 
 @router.post("/translate", response_model=GeneratedContent)
 async def translate_listing_endpoint(request: TranslateRequest):
-    if not groq_client:
+    if not get_groq_client():
         raise HTTPException(status_code=500, detail="Groq API key not configured.")
 
     content = request.content
@@ -251,22 +344,35 @@ async def translate_listing_endpoint(request: TranslateRequest):
 
         return content
     except Exception as e:
-        print(f"Error during translation: {e}")
+        logger.exception("Error during translation: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to translate listing: {e}")
 
+# Translations of the same text are stable, so they are cached for a week
+TRANSLATION_CACHE_TTL = 7 * 24 * 60 * 60
+
 async def translate_text(text: str, language: str) -> str:
     """Helper function to translate a single piece of text using Groq."""
     if not text: return ""
-    try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": f"You are an expert translator. Translate the following text to {language}. Respond only with the translated text, no extra explanation."},
-                {"role": "user", "content": text}
-            ],
-            model="gemma2-9b-it",
-            temperature=0.1,
-        )
-        return chat_completion.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"Failed to translate text '{text}' to {language}: {e}")
-        return text # Return original text on failure 
\ No newline at end of file
+
+    async def translate():
+        groq_client = get_groq_client()
+        try:
+            with upstream_call("groq"):
+                chat_completion = await groq_client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": f"You are an expert translator. Translate the following text to {language}. Respond only with the translated text, no extra explanation."},
+                        {"role": "user", "content": text}
+                    ],
+                    model="gemma2-9b-it",
+                    temperature=0.1,
+                )
+            record_llm_tokens("listing_translate", chat_completion)
+            return chat_completion.choices[0].message.content.strip()
+        except Exception as e:
+            logger.warning("Failed to translate text %r to %s: %s", text, language, e)
+            return None # Not cached, so the next request retries
+
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+    cache_key = f"translation:{language.strip().lower()}:{text_hash}"
+    translated = await get_cache().get_or_set(cache_key, translate, TRANSLATION_CACHE_TTL)
+    return translated or text # Return original text on failure
@@ -0,0 +1,270 @@
+# profiling.py
+# On-demand request profiling and event-loop lag monitoring.
+#
+# A request is profiled when it carries `X-Profile: <PROFILE_ADMIN_TOKEN>` or is picked by
+# PROFILE_SAMPLE_RATE. While it runs, a background thread samples the Python stacks of the
+# event loop thread and of the asyncio worker threads (where scraping, Gemini REST calls and
+# other to_thread work run). The samples are saved as a speedscope file in PROFILE_DIR
+# (open it at https://www.speedscope.app). The request's upstream and pipeline-stage spans
+# are returned in a Server-Timing header, and the profile's file name in X-Profile.
+#
+# The loop-lag monitor runs for the whole process: a watchdog thread notices when the event
+# loop misses its heartbeat for longer than LOOP_LAG_THRESHOLD and logs the stack of the
+# synchronous call that is blocking it.
+
+import os
+import sys
+import hmac
+import json
+import time
+import random
+import logging
+import asyncio
+import tempfile
+import threading
+import traceback
+from collections import defaultdict
+from datetime import datetime
+
+from backend.metrics import EVENT_LOOP_LAG, collect_timeline
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "copilot-profiles"))
+PROFILE_HEADER = b"x-profile"
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+
+# Only one request is profiled at a time; the samples of concurrent profiles would mix
+_profile_lock = threading.Lock()
+
+
+# --- Sampling Profiler ---
+class StackSampler(threading.Thread):
+    """Samples the stacks of the event loop thread and the asyncio worker threads at a fixed interval."""
+
+    def __init__(self, loop_thread_id, interval=PROFILE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.frames = []
+        self._frame_index = {}
+        self.samples = defaultdict(list)  # thread name -> [(frame indexes, weight_ms)]
+        self._stop_event = threading.Event()
+        self.started_at = time.perf_counter()
+        self.stopped_at = None
+
+    def _frame(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self, weight_ms):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = "event loop" if ident == self.loop_thread_id else names.get(ident, "")
+            if name != "event loop" and not name.startswith("asyncio_"):
+                continue
+            # Skip samples of idle worker threads waiting for their next work item
+            if name != "event loop" and (frame.f_code.co_filename == threading.__file__
+                                         or frame.f_code.co_name == "_worker"):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[name].append((stack, weight_ms))
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            self._sample((now - last) * 1000)
+            last = now
+
+    def stop(self):
+        """Asks the sampler to stop without waiting for it; join() before reading the samples."""
+        if self.stopped_at is None:
+            self.stopped_at = time.perf_counter()
+        self._stop_event.set()
+
+    def to_speedscope(self, name):
+        end_ms = ((self.stopped_at or time.perf_counter()) - self.started_at) * 1000
+        profiles = []
+        for thread_name, samples in sorted(self.samples.items()):
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": end_ms,
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "copilot-backend profiling",
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+def server_timing(timeline, total):
+    """Formats timeline spans, summed per name, plus the total as a Server-Timing header value."""
+    durations, counts = defaultdict(float), defaultdict(int)
+    for name, _, duration in timeline:
+        durations[name] += duration
+        counts[name] += 1
+    entries = [f'{name};dur={durations[name] * 1000:.1f};desc="x{counts[name]}"' for name in durations]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def profile_file_name(route):
+    slug = route.strip("/").replace("/", "-") or "root"
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{slug}-{os.urandom(3).hex()}.speedscope.json"
+
+
+def save_profile(sampler, name, file_name):
+    """Waits for a stopped sampler's last sample and writes the profile. Blocking, so run it in a thread."""
+    sampler.join()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, file_name), "w") as profile_file:
+        json.dump(sampler.to_speedscope(name), profile_file)
+
+
+# --- Middleware ---
+class ProfilingMiddleware:
+    """Pure ASGI middleware that profiles requests selected by the admin header or the sample rate."""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope):
+        if PROFILE_ADMIN_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value.decode("latin-1"), PROFILE_ADMIN_TOKEN)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope) or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(threading.get_ident())
+        start = time.perf_counter()
+        route = f'{scope["method"]} {scope["path"]}'
+        file_name = None
+
+        def finish(timeline):
+            # Runs once, when the response starts, so the summary can go into its headers. Only the
+            # header values are computed here; joining the sampler and writing the file block, so
+            # they happen in a thread once the request is done.
+            nonlocal file_name
+            if file_name:
+                return None
+            sampler.stop()
+            total = time.perf_counter() - start
+            timing = server_timing(timeline, total)
+            file_name = profile_file_name(scope["path"])
+            logger.info("Profiled %s in %.0fms -> %s (%s)", route, total * 1000, os.path.join(PROFILE_DIR, file_name),
+                        timing, extra={"latency_ms": round(total * 1000, 1), "profile": file_name})
+            return timing, file_name
+
+        try:
+            with collect_timeline() as timeline:
+                async def send_with_profile(message):
+                    if message["type"] == "http.response.start":
+                        result = finish(timeline)
+                        if result:
+                            timing, profile_name = result
+                            message["headers"] = list(message.get("headers", [])) + [
+                                (b"server-timing", timing.encode("latin-1")),
+                                (b"x-profile", profile_name.encode("latin-1")),
+                            ]
+                    await send(message)
+
+                sampler.start()
+                await self.app(scope, receive, send_with_profile)
+                finish(timeline)
+        finally:
+            sampler.stop()
+            try:
+                if file_name:
+                    await asyncio.to_thread(save_profile, sampler, route, file_name)
+            finally:
+                _profile_lock.release()
+
+
+def setup_profiling(app):
+    """Adds the on-demand profiling middleware to the FastAPI application."""
+    app.add_middleware(ProfilingMiddleware)
+
+
+# --- Event Loop Lag Monitor ---
+class LoopLagMonitor:
+    """
+    Schedules a heartbeat on the event loop, which records its lag in EVENT_LOOP_LAG, and watches
+    it from a separate thread. When the loop misses its heartbeat by more than `threshold`, the
+    thread logs the blocking call's stack.
+    """
+
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, interval=0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self._loop = None
+        self._loop_thread_id = None
+        self._handle = None
+        self._expected = 0.0
+        self._heartbeat = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+        # Only recorded here; the watchdog thread logs the stall, with its stack, while it happens
+        EVENT_LOOP_LAG.observe(lag)
+        self._heartbeat = now
+        self._expected = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        reported = None
+        while not self._stop_event.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and reported != heartbeat:
+                # Report each blocking episode once, with the stack of whatever is running on the loop
+                reported = heartbeat
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else "(no stack)\n"
+                logger.warning("Event loop blocked for over %.0fms", blocked * 1000,
+                               extra={"lag_ms": round(blocked * 1000, 1), "stack": stack})
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._expected = self._heartbeat + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._handle:
+            self._handle.cancel()
+        if self._thread:
+            self._thread.join()
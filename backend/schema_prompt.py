@@ -0,0 +1,96 @@
+# schema_prompt.py
+# Compact format instructions for structured LLM output.
+#
+# PydanticOutputParser.get_format_instructions() embeds the full JSON Schema of a model,
+# with titles, $defs and every description, which costs thousands of prompt tokens.
+# This module renders the same model as a terse TypeScript-like shape with short hints.
+# The response is still parsed and validated by PydanticOutputParser as before.
+
+import os
+import re
+import types
+import typing
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+COMPACT_PREAMBLE = (
+    "Respond with only a JSON object matching this TypeScript-style shape "
+    "(`?` marks optional keys, `//` comments are hints and must not be output):"
+)
+
+_OPTIONS = re.compile(r"'[^']+'(?:,\s*'[^']+')*,?\s+or\s+'[^']+'")
+_QUOTED = re.compile(r"'([^']+)'")
+_PRIMITIVES = {str: "string", int: "number", float: "number", bool: "boolean", dict: "object"}
+
+
+def _hint(description):
+    """Shortens a Field description to its first sentence, without filler."""
+    if not description:
+        return ""
+    hint = description.replace("e.g.,", "e.g.").strip()
+    # Cut at the first sentence end that is not part of "e.g."
+    match = re.search(r"(?<!e\.g)(?<!\be)\.(\s|$)", hint)
+    if match:
+        hint = hint[:match.start()]
+    hint = re.sub(r"^(The|A|An)\s+", "", hint)
+    return hint[:1].upper() + hint[1:]
+
+
+def _options(description):
+    """Returns the quoted alternatives of a description like "Level: 'high', 'medium', or 'low'"."""
+    if not description or "e.g." in description:
+        return None
+    match = _OPTIONS.search(description)
+    return _QUOTED.findall(match.group(0)) if match else None
+
+
+def _render_type(annotation, indent):
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        rendered = [_render_type(arg, indent) for arg in args if arg is not type(None)]
+        if type(None) in args:
+            rendered.append("null")
+        return " | ".join(rendered)
+    if origin in (list, typing.List, set, tuple):
+        if not args:
+            return "any[]"
+        inner = _render_type(args[0], indent)
+        return f"({inner})[]" if typing.get_origin(args[0]) in (typing.Union, types.UnionType) else f"{inner}[]"
+    if origin is typing.Literal:
+        return " | ".join(f'"{arg}"' if isinstance(arg, str) else str(arg) for arg in args)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _render_model(annotation, indent)
+    return _PRIMITIVES.get(annotation, "any")
+
+
+def _render_model(model, indent=0):
+    pad = "  " * (indent + 1)
+    lines = ["{"]
+    for name, field in model.model_fields.items():
+        key = name if field.is_required() else f"{name}?"
+        options = _options(field.description) if field.annotation is str else None
+        rendered = " | ".join(f'"{option}"' for option in options) if options else _render_type(field.annotation, indent + 1)
+        hint = "" if options else _hint(field.description)
+        lines.append(f"{pad}{key}: {rendered}" + (f"  // {hint}" if hint else ""))
+    lines.append("  " * indent + "}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def compact_format_instructions(model):
+    """Renders a Pydantic model as compact, TypeScript-like format instructions."""
+    return f"{COMPACT_PREAMBLE}\n```\n{_render_model(model)}\n```"
+
+
+def get_format_instructions(model):
+    """
+    Format instructions for a structured-output prompt. Compact by default;
+    set COMPACT_SCHEMA_PROMPTS=0 to use LangChain's full JSON Schema instructions.
+    """
+    if os.getenv("COMPACT_SCHEMA_PROMPTS", "1") == "1":
+        return compact_format_instructions(model)
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    return PydanticOutputParser(pydantic_object=model).get_format_instructions()
@@ -0,0 +1,137 @@
+# session_routes.py
+# Speculative prefetch of a seller's reports when their session starts.
+#
+# The frontend calls POST /api/session/start with the seller's location and main category
+# as soon as the chat or dashboard opens. The planner and trends reports for that pair are
+# then generated in the background, so they are usually cached by the time the seller
+# navigates to those pages. Prefetching is deduplicated (reports that are cached or already
+# being generated, by this or another worker, are skipped), limited to a few concurrent
+# generations, and capped by an hourly token budget per worker.
+
+import os
+import time
+import logging
+import asyncio
+from fastapi import APIRouter, status
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+from backend.cache import get_cache
+from backend.metrics import SESSION_PREFETCHES, meter_tokens
+from backend.cache_warmer import DEFAULT_CATEGORY, report_jobs, estimated_report_tokens, record_report_tokens
+
+# --- Configuration ---
+SESSION_PREFETCH = os.getenv("SESSION_PREFETCH", "1") == "1"
+# Upper bound on LLM tokens spent on prefetching per worker per hour
+PREFETCH_TOKEN_BUDGET = int(os.getenv("PREFETCH_TOKEN_BUDGET", "100000"))
+PREFETCH_BUDGET_WINDOW = 60 * 60
+# Reports generated in the background at once; further prefetches are skipped, not queued
+PREFETCH_MAX_CONCURRENT = int(os.getenv("PREFETCH_MAX_CONCURRENT", "4"))
+# Claims a report for one worker while it generates it
+PREFETCH_LOCK_TTL = 5 * 60
+
+# --- Router Initialization ---
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+# --- Token Budget ---
+class TokenBudget:
+    """A token allowance that resets every `window` seconds. Generations reserve their estimated cost up front."""
+
+    def __init__(self, tokens, window):
+        self.tokens = tokens
+        self.window = window
+        self.spent = 0
+        self._window_start = time.monotonic()
+
+    def try_reserve(self, tokens):
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self.spent = 0
+        if self.spent + tokens > self.tokens:
+            return False
+        self.spent += tokens
+        return True
+
+    def settle(self, reserved, used):
+        """Replaces a reservation with the tokens the generation actually used."""
+        self.spent = max(0, self.spent - reserved + used)
+
+_budget = TokenBudget(PREFETCH_TOKEN_BUDGET, PREFETCH_BUDGET_WINDOW)
+_inflight = {}  # cache key -> background task
+
+
+# --- Background Generation ---
+async def _prefetch(report, key, build, reserved):
+    used = 0
+    try:
+        with meter_tokens() as meter:
+            try:
+                await build()
+            finally:
+                used = meter["prompt"] + meter["completion"]
+        record_report_tokens(report, used)
+        SESSION_PREFETCHES.inc(report=report, outcome="generated")
+    except Exception as e:
+        logger.error("Session prefetch failed to generate %r: %s", key, e)
+        SESSION_PREFETCHES.inc(report=report, outcome="error")
+    finally:
+        _budget.settle(reserved, used)
+        _inflight.pop(key, None)
+
+async def start_prefetch(location, category):
+    """Schedules background generation of the missing reports for a pair; returns each report's status."""
+    cache = get_cache()
+    statuses = {}
+    for report, key, build in report_jobs([(location, category)]):
+        estimate = estimated_report_tokens(report)
+        if await cache.get(key) is not None:
+            outcome = "cached"
+        elif key in _inflight:
+            outcome = "in_progress"
+        elif len(_inflight) >= PREFETCH_MAX_CONCURRENT:
+            outcome = "busy"
+        elif not _budget.try_reserve(estimate):
+            outcome = "over_budget"
+        elif not await cache.add(f"prefetch:{key}", os.getpid(), PREFETCH_LOCK_TTL):
+            # Another worker is already generating it
+            _budget.settle(estimate, 0)
+            outcome = "in_progress"
+        else:
+            _inflight[key] = asyncio.create_task(_prefetch(report, key, build, estimate))
+            outcome = "scheduled"
+        SESSION_PREFETCHES.inc(report=report, outcome=outcome)
+        statuses[report] = outcome
+    return statuses
+
+async def cancel_prefetches():
+    """Cancels running prefetches on shutdown."""
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# --- Pydantic Models for Session Start ---
+class SessionStartRequest(BaseModel):
+    location: str = Field(min_length=1)
+    category: Optional[str] = None
+
+class SessionStartResponse(BaseModel):
+    reports: Dict[str, str]
+
+
+# --- API Endpoint for Session Start ---
+@router.post("/start", response_model=SessionStartResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_session(session: SessionStartRequest):
+    """
+    Starts generating the seller's planner and trends reports in the background.
+    Each report's status is one of 'cached', 'scheduled', 'in_progress', 'busy',
+    'over_budget' or 'disabled'.
+    """
+    category = session.category or DEFAULT_CATEGORY
+    if not SESSION_PREFETCH:
+        return SessionStartResponse(reports={"planner": "disabled", "trends": "disabled"})
+    return SessionStartResponse(reports=await start_prefetch(session.location, category))
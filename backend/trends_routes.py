@@ -1,13 +1,17 @@
-import os
-import json
-from fastapi import APIRouter, HTTPException, Query
+import logging
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
-# --- LangChain Imports ---
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+# --- Custom Utility Import ---
+from backend.metrics import observe_stage, record_llm_tokens
+from backend.circuit_breaker import upstream_call, service_unavailable, CircuitOpenError
+from backend.clients import get_chat_groq
+from backend.cache import REPORT_CACHE_TTL
+from backend.http_cache import get_or_create_entry, entry_response
+from backend.schema_prompt import get_format_instructions
+from backend.cache_warmer import record_report_request
 
 
 # --- Pydantic Models for Structured JSON Response ---
@@ -57,24 +61,26 @@ class TrendsResponse(BaseModel):
 
 # --- Router Initialization ---
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # --- AI Model Configuration ---
-try:
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise KeyError("GROQ_API_KEY not found in .env file")
-    
-    model = ChatGroq(model='gemma2-9b-it', model_kwargs={"response_format": {"type": "json_object"}})
-except Exception as e:
-    print(f"Error during Groq configuration in trends: {e}")
-    model = None
+# The JSON-mode Groq client is created on first use; see backend/clients.py.
 
-# --- API Endpoint for Trends & Insights ---
-@router.get("/full-trends-report", response_model=TrendsResponse)
-async def get_full_trends_report(location: str = "Delhi", category: str = "Kurtis"):
+
+# --- Report Generation ---
+def trends_cache_key(location: str, category: str) -> str:
+    # "v2": the value is an HTTP cache entry, not a bare report; see planner_cache_key
+    return f"trends:v2:{location.strip().lower()}:{category.strip().lower()}:{datetime.now().date().isoformat()}"
+
+async def generate_trends_report(location: str, category: str) -> TrendsResponse:
+    """Generates a fresh trends report for a location and category with the LLM (uncached)."""
+    model = get_chat_groq(json_mode=True)
     if not model:
         raise HTTPException(status_code=500, detail="Groq API model is not configured.")
 
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import PydanticOutputParser
+
     try:
         # 1. Set up the Pydantic Output Parser
         parser = PydanticOutputParser(pydantic_object=TrendsResponse)
@@ -92,19 +98,38 @@ async def get_full_trends_report(location: str = "Delhi", category: str = "Kurti
             {format_instructions}
             """,
             input_variables=["location", "category"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
+            partial_variables={"format_instructions": get_format_instructions(TrendsResponse)},
         )
 
-        # 3. Create the processing chain
-        chain = prompt_template | model | parser
-        
+        # 3. Create the processing chain (the parser runs separately so token usage can be recorded)
+        chain = prompt_template | model
+
         # 4. Invoke the chain with the query
-        response = await chain.ainvoke({"location": location, "category": category})
+        with upstream_call("groq"):
+            ai_message = await chain.ainvoke({"location": location, "category": category})
+        record_llm_tokens("trends", ai_message)
+        with observe_stage("trends", "parse"):
+            response = parser.parse(ai_message.content)
         
         return response
 
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        print(f"An error occurred in trends endpoint: {e}")
+        logger.exception("An error occurred in trends endpoint: %s", e)
         # This will now catch errors from the parser if the AI fails to generate a valid object
         raise HTTPException(status_code=500, detail=f"An error occurred while generating the trends report: {e}")
 
+
+# --- API Endpoint for Trends & Insights ---
+async def get_trends_report_entry(location: str, category: str):
+    """Returns the cached response entry for a location and category, generating it on a miss."""
+    async def generate():
+        return (await generate_trends_report(location, category)).model_dump()
+
+    return await get_or_create_entry(trends_cache_key(location, category), generate, REPORT_CACHE_TTL)
+
+@router.get("/full-trends-report", response_model=TrendsResponse)
+async def get_full_trends_report(request: Request, location: str = "Delhi", category: str = "Kurtis"):
+    record_report_request(location, category)
+    return entry_response(request, await get_trends_report_entry(location, category))
@@ -1,11 +1,41 @@
-import json
-import calendar
+import asyncio
+import logging
 from datetime import datetime, timedelta
 
-from backend.local_festivals import IndianFestivals
+from backend.local_festivals import IndianFestivals, load_festival_snapshot
+from backend.cache import get_cache
 
+logger = logging.getLogger(__name__)
 
-def _get_raw_upcoming_festivals():
+# Festival calendars change rarely, so each scraped year is cached for a day.
+FESTIVAL_CACHE_TTL = 24 * 60 * 60
+
+
+def _fetch_festivals_for_year(year):
+    """
+    Scrapes one year of festival data from the library.
+    Returns a list of {"name", "date" ('YYYY-MM-DD')} dictionaries.
+    """
+    return IndianFestivals(str(year)).get_festival_dates()
+
+
+async def get_festivals_for_year(year):
+    """
+    Returns one year of festival data from the bundled snapshot, or, for years it
+    doesn't cover, scrapes it in a worker thread on a cache miss.
+    """
+    festivals = load_festival_snapshot().get(year)
+    if festivals:
+        return festivals
+
+    async def fetch():
+        # An empty scrape usually means the page changed or failed, so don't cache it
+        return await asyncio.to_thread(_fetch_festivals_for_year, year) or None
+
+    return await get_cache().get_or_set(f"festivals:{year}", fetch, FESTIVAL_CACHE_TTL) or []
+
+
+async def get_raw_upcoming_festivals():
     """
     Fetches raw festival data from the library, handling the year-end case.
     Returns a list of festival dictionaries.
@@ -17,46 +47,31 @@ def _get_raw_upcoming_festivals():
     for year_offset in range(2):
         year_to_fetch = today.year + year_offset
         try:
-            fest_finder = IndianFestivals(str(year_to_fetch))
-            # The library can return a string or a dict, so handle both cases
-            festivals_str = fest_finder.get_festivals_in_a_year()
-            festivals_by_month = json.loads(festivals_str) if isinstance(festivals_str, str) else festivals_str
-            
-            month_map = {name: num for num, name in enumerate(calendar.month_name) if num}
-
-            for month_name, festivals in festivals_by_month.items():
-                month_number = month_map.get(month_name)
-                if not month_number:
-                    continue
-
-                for festival in festivals:
-                    try:
-                        festival_date = datetime(year_to_fetch, month_number, int(festival['date']))
-                        all_festivals.append({"name": festival.get('name', 'Unknown Festival'), "date": festival_date})
-                    except (ValueError, KeyError, TypeError):
-                        continue # Ignore malformed festival entries
+            festivals = await get_festivals_for_year(year_to_fetch)
         except Exception as e:
-            print(f"Warning: Could not fetch or parse festival data for year {year_to_fetch}. Error: {e}")
+            logger.warning("Could not fetch or parse festival data for year %s: %s", year_to_fetch, e)
             continue
-    
+        for festival in festivals:
+            all_festivals.append({"name": festival["name"], "date": datetime.strptime(festival["date"], '%Y-%m-%d')})
+
     # Filter for festivals in the next 90 days and sort them
     upcoming = [f for f in all_festivals if today <= f["date"] <= today + timedelta(days=90)]
     upcoming.sort(key=lambda x: x['date'])
     return upcoming
 
-def get_upcoming_festivals_for_prompt():
+async def get_upcoming_festivals_for_prompt():
     """Formats upcoming festivals as a comma-separated string for the planner's AI prompt."""
-    upcoming_festivals = _get_raw_upcoming_festivals()
+    upcoming_festivals = await get_raw_upcoming_festivals()
     if not upcoming_festivals:
         return "No major festivals in the next few months."
-    
+
     # Return up to 15 festivals for the prompt
     return ", ".join([f"{f['name']} ({f['date'].strftime('%Y-%m-%d')})" for f in upcoming_festivals[:15]])
 
-def get_upcoming_festivals_for_chat():
+async def get_upcoming_festivals_for_chat():
     """Formats upcoming festivals as a newline-separated string for the chat's context."""
-    upcoming_festivals = _get_raw_upcoming_festivals()
+    upcoming_festivals = await get_raw_upcoming_festivals()
     if not upcoming_festivals:
         return "No major festivals in the next 90 days."
 
-    return "\n".join([f"- {f['name']} on {f['date'].strftime('%B %d, %Y')}" for f in upcoming_festivals]) 
+    return "\n".join([f"- {f['name']} on {f['date'].strftime('%B %d, %Y')}" for f in upcoming_festivals])
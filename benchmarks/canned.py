@@ -0,0 +1,132 @@
+# canned.py
+# Canned LLM replies used by the fake upstream servers. Each reply must validate
+# against the Pydantic model the corresponding router parses it with.
+
+import json
+import re
+
+# Planner: only the LLM-generated part (PlannerAIResponse); festival dates are computed locally.
+PLANNER_REPORT = {
+    "festivalPlans": [
+        {"name": name, "items": ["Sarees", "Kurtis"], "expectedSales": "₹50,000"}
+        for name in ["Diwali", "Chhath Puja", "Guru Nanak Jayanti", "Christmas"]
+    ],
+    "topProductsToStock": [
+        {"id": i, "name": f"Silk Saree #B{i}", "demand": "High", "profit": "₹450", "units": "25-30",
+         "trend": "+15%", "yourPrice": "₹1200", "stockLevel": "Low", "urgency": "high"}
+        for i in range(1, 6)
+    ],
+    "nearbyDemand": [
+        {"id": i, "area": area, "product": "Ethnic Wear", "demand": "High", "distance": "5 km",
+         "avgSpend": "₹1,500", "shoppers": 5000, "peakHours": "6-8 PM"}
+        for i, area in enumerate(["Karol Bagh", "Lajpat Nagar", "Chandni Chowk"], 1)
+    ],
+    "avoidProducts": [
+        {"id": i, "name": f"Woollen Shawl #{i}", "reason": "Seasonal Mismatch", "suggestion": "Wait until December",
+         "returnRate": "25%", "impact": "High Inventory Cost", "lossAmount": "₹5,000"}
+        for i in range(1, 4)
+    ],
+    "aiRecommendations": [
+        {"id": i, "product": f"Kurti Set #A{i}", "action": "Restock 50 units", "priority": "High",
+         "reason": "Festival demand spike expected", "confidence": "92%", "potentialRevenue": "₹3,500"}
+        for i in range(1, 6)
+    ],
+}
+
+TRENDS_REPORT = {
+    "personalizedInsights": [
+        {"location": "Jaipur", "trend": "Cotton Kurtis", "change": "+32%", "type": "opportunity",
+         "message": "Demand for cotton kurtis is rising ahead of the festive season.", "action": "Promote Now"}
+        for _ in range(3)
+    ],
+    "categoryData": [
+        {"period": f"Week {i}", "searches": 1000 + 100 * i, "purchases": 200 + 20 * i, "events": None}
+        for i in range(1, 6)
+    ],
+    "hotspots": [
+        {"area": "Karol Bagh", "pincode": "110005", "city": "Delhi", "product": "Kurtis", "trend": "up",
+         "activity": 80}
+        for _ in range(4)
+    ],
+    "trendingProducts": [
+        {"product": "Anarkali Kurti", "trend": "+32%", "avgPrice": "₹799", "action": "Promote Now",
+         "similarity": 85}
+        for _ in range(4)
+    ],
+    "returnedProducts": [
+        {"product": "Rayon Kurti", "returnRate": "18%", "mainReason": "Size mismatch",
+         "suggestion": "Add a detailed size chart"}
+        for _ in range(3)
+    ],
+}
+
+SEO_CONTENT = {
+    "title": "Elegant Cotton Anarkali Kurti with Floral Print for Women",
+    "description": "A breathable cotton kurti with a flattering Anarkali flare and a vibrant floral print.",
+    "tags": ["kurti", "anarkali", "cotton", "floral", "ethnic wear", "women", "festive", "casual",
+             "summer", "printed"],
+    "keywords": ["cotton kurti", "anarkali kurti", "floral kurti", "women ethnic wear", "festive kurti"],
+}
+
+WHATSAPP_CONTENT = {
+    "caption": "Twirl into the festive season with our floral Anarkali ✨",
+    "promotional_message": "Breathable cotton, a flattering flare and prints you'll love. Order now! 🛍️",
+}
+
+CONVERSATIONAL_CONTENT = {
+    "search_phrases": ["cotton kurti for summer", "floral anarkali for office", "kurti for haldi function"],
+}
+
+CHAT_REPLY = "Diwali is coming up soon! Stock up on sarees, kurtis and decorative items this month."
+
+IMAGE_DESCRIPTION = "A pink cotton Anarkali kurti with a white floral print, three-quarter sleeves and a round neck."
+
+IMPROVED_LISTING = {
+    "category": "Kurtis",
+    "seo_content": SEO_CONTENT,
+    "whatsapp_content": WHATSAPP_CONTENT,
+    "conversational_content": CONVERSATIONAL_CONTENT,
+}
+
+_BATCH_LOCATIONS = re.compile(r"each of these locations: (\[.*?\])")
+
+
+def planner_batch_report(prompt):
+    """Batched planner (PlannerBatchAIResponse): the canned plan for every location listed in the prompt."""
+    match = _BATCH_LOCATIONS.search(prompt)
+    locations = json.loads(match.group(1)) if match else []
+    return {"locationPlans": [{"location": location, "plan": PLANNER_REPORT} for location in locations]}
+
+
+# Ordered (marker, reply) rules: the first marker found in the prompt selects the reply.
+# Markers are schema field names, which appear in the format instructions of every structured prompt.
+# A callable reply is called with the prompt.
+GROQ_RULES = [
+    ("Improve this product content", IMPROVED_LISTING),
+    ("locationPlans", planner_batch_report),
+    ("aiRecommendations", PLANNER_REPORT),
+    ("personalizedInsights", TRENDS_REPORT),
+    ("promotional_message", WHATSAPP_CONTENT),
+    ("search_phrases", CONVERSATIONAL_CONTENT),
+    ("keywords", SEO_CONTENT),
+]
+
+LISTING_CONTENT = {
+    "seo_content": SEO_CONTENT,
+    "whatsapp_content": WHATSAPP_CONTENT,
+    "conversational_content": CONVERSATIONAL_CONTENT,
+}
+
+
+def single_pass_listing(prompt):
+    """Single-pass listing (the combined ListingContent model): only the parts the prompt asks for."""
+    return {name: content for name, content in LISTING_CONTENT.items() if f"'{name}'" in prompt}
+
+
+# Ordered (marker, reply) rules for Gemini; without a match it returns IMAGE_DESCRIPTION.
+# The single-pass listing prompt names the GeneratedContent field of every part it asks for.
+GEMINI_RULES = [
+    ("'seo_content'", single_pass_listing),
+    ("'whatsapp_content'", single_pass_listing),
+    ("'conversational_content'", single_pass_listing),
+]
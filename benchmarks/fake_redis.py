@@ -0,0 +1,122 @@
+# fake_redis.py
+# A tiny in-memory server speaking enough of the Redis protocol (RESP2) for
+# backend.cache.RedisBackend: PING, AUTH, SELECT, GET, SET [EX|PX] [NX], DEL.
+# Used as a local stand-in for benchmarks and manual testing.
+#
+# Run standalone with: python -m benchmarks.fake_redis --port 6379
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    store: _Store = None
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()  # Inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _reply(self, value):
+        if value is None:
+            data = b"$-1\r\n"
+        elif isinstance(value, int):
+            data = b":%d\r\n" % value
+        elif isinstance(value, str):
+            data = f"+{value}\r\n".encode()
+        elif isinstance(value, Exception):
+            data = f"-ERR {value}\r\n".encode()
+        else:
+            data = b"$%d\r\n%s\r\n" % (len(value), value)
+        self.wfile.write(data)
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                self._reply(self.execute(args[0].decode().upper(), args[1:]))
+            except Exception as e:
+                self._reply(e)
+
+    def execute(self, command, args):
+        store = self.store
+        if command in ("PING", "AUTH", "SELECT"):
+            return "PONG" if command == "PING" else "OK"
+        with store.lock:
+            if command == "GET":
+                return store.get(args[0])
+            if command == "DEL":
+                return sum(1 for key in args if store.data.pop(key, None) is not None)
+            if command == "SET":
+                key, value, options = args[0], args[1], [arg.decode().upper() for arg in args[2:]]
+                expires_at = None
+                if "EX" in options:
+                    expires_at = time.time() + int(options[options.index("EX") + 1])
+                if "PX" in options:
+                    expires_at = time.time() + int(options[options.index("PX") + 1]) / 1000
+                if "NX" in options and store.get(key) is not None:
+                    return None
+                store.data[key] = (value, expires_at)
+                return "OK"
+        raise ValueError(f"unknown command '{command}'")
+
+
+class FakeRedis:
+    """Runs the RESP server in a background thread on an ephemeral (or given) port."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        handler = type("Handler", (RESPHandler,), {"store": _Store()})
+        server_class = type("Server", (socketserver.ThreadingTCPServer,), {"request_queue_size": 128})
+        self.server = server_class((host, port), handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-redis", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a minimal in-memory Redis-protocol server.")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    fake = FakeRedis(port=args.port)
+    print(f"Fake Redis listening at {fake.url}")
+    fake.server.serve_forever()
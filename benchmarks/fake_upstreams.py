@@ -0,0 +1,257 @@
+# fake_upstreams.py
+# Local stand-ins for the backend's upstream services so the routers can be
+# benchmarked without network access or API quota:
+#   - an OpenAI-compatible Groq chat completions server
+#   - a Gemini REST (generateContent) server
+#   - a static astrosage festival calendar page
+#   - an OpenWeatherMap current-weather stub
+#
+# Run standalone with: python -m benchmarks.fake_upstreams --groq-latency 0.5
+
+import argparse
+import calendar
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import canned
+
+# Festivals served by the fake calendar page as (month, day, name); every year gets the same set.
+FAKE_FESTIVALS = [
+    (1, 1, "New Year"), (1, 14, "Makar Sankranti"), (1, 26, "Republic Day"), (3, 4, "Holi"),
+    (3, 21, "Eid ul-Fitr"), (4, 14, "Baisakhi"), (8, 15, "Independence Day"), (8, 28, "Raksha Bandhan"),
+    (9, 4, "Janmashtami"), (9, 14, "Ganesh Chaturthi"), (10, 2, "Gandhi Jayanti"), (10, 11, "Navratri"),
+    (10, 20, "Dussehra"), (10, 29, "Karwa Chauth"), (11, 6, "Dhanteras"), (11, 8, "Diwali"),
+    (11, 15, "Chhath Puja"), (11, 24, "Guru Nanak Jayanti"), (12, 25, "Christmas"),
+]
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for fake usage accounting."""
+    return max(1, len(text) // 4)
+
+
+class UpstreamConfig:
+    """Per-server latency settings, mutable while the servers are running."""
+
+    def __init__(self, latency=0.0, latency_per_1k_prompt_tokens=0.0, latency_per_1k_completion_tokens=0.0):
+        self.latency = latency
+        self.latency_per_1k_prompt_tokens = latency_per_1k_prompt_tokens
+        self.latency_per_1k_completion_tokens = latency_per_1k_completion_tokens
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def simulate(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        delay = (self.latency + self.latency_per_1k_prompt_tokens * prompt_tokens / 1000
+                 + self.latency_per_1k_completion_tokens * completion_tokens / 1000)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: UpstreamConfig = None
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = (json.dumps(body) if content_type == "application/json" else body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# --- Groq / OpenAI-compatible chat completions ---
+class GroqHandler(_Handler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+        payload = self._read_json()
+        prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        reply = canned.CHAT_REPLY
+        for marker, canned_reply in canned.GROQ_RULES:
+            if marker in prompt:
+                reply = json.dumps(canned_reply(prompt) if callable(canned_reply) else canned_reply)
+                break
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(reply)
+        self.config.simulate(prompt_tokens, completion_tokens)
+        self._send(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+# --- Gemini REST generateContent ---
+class GeminiHandler(_Handler):
+    def do_POST(self):
+        if ":generateContent" not in self.path:
+            return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+        payload = self._read_json()
+        texts = [part.get("text", "") for content in payload.get("contents", [])
+                 for part in content.get("parts", []) if "text" in part]
+        images = sum(1 for content in payload.get("contents", [])
+                     for part in content.get("parts", []) if "inlineData" in part or "inline_data" in part)
+        prompt = "\n".join(texts)
+        reply = canned.IMAGE_DESCRIPTION
+        for marker, canned_reply in canned.GEMINI_RULES:
+            if marker in prompt:
+                reply = json.dumps(canned_reply(prompt) if callable(canned_reply) else canned_reply)
+                break
+        # Gemini bills a fixed 258 tokens per image
+        prompt_tokens, completion_tokens = estimate_tokens(prompt) + 258 * images, estimate_tokens(reply)
+        self.config.simulate(prompt_tokens, completion_tokens)
+        self._send(200, {
+            "candidates": [{"content": {"parts": [{"text": reply}], "role": "model"},
+                            "finishReason": 1, "index": 0}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens,
+                              "totalTokenCount": prompt_tokens + completion_tokens},
+        })
+
+
+# --- Astrosage festival calendar ---
+def render_festival_calendar(year):
+    """Renders a calendar page in the table layout that IndianFestivals parses."""
+    tables = []
+    for month in range(1, 13):
+        rows = []
+        for fest_month, day, name in FAKE_FESTIVALS:
+            if fest_month != month:
+                continue
+            weekday = calendar.day_name[date(year, month, day).weekday()]
+            rows.append(f"<tr><td>{day:02d} {weekday}</td><td>{name}</td></tr>")
+        tables.append(f"<table><thead><tr><th>{calendar.month_name[month]} {year}</th><th>Festival</th></tr></thead>"
+                      f"<tbody>{''.join(rows)}</tbody></table>")
+    return f"<html><body>{''.join(tables)}</body></html>"
+
+
+class AstrosageHandler(_Handler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        year = int(query.get("date", [date.today().year])[0])
+        self.config.simulate(0, 0)
+        self._send(200, render_festival_calendar(year), content_type="text/html; charset=utf-8")
+
+
+# --- OpenWeatherMap ---
+class WeatherHandler(_Handler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("/weather"):
+            return self._send(404, {"cod": 404, "message": "Not found"})
+        self.config.simulate(0, 0)
+        description = "साफ आसमान" if parse_qs(url.query).get("lang") == ["hi"] else "clear sky"
+        self._send(200, {"weather": [{"main": "Clear", "description": description}],
+                         "main": {"temp": 31.2, "humidity": 40}, "name": "New Delhi"})
+
+
+class FakeUpstreams:
+    """Starts every fake upstream on an ephemeral local port, each in its own thread."""
+
+    HANDLERS = {"groq": GroqHandler, "gemini": GeminiHandler, "astrosage": AstrosageHandler,
+                "openweathermap": WeatherHandler}
+
+    def __init__(self, groq_latency=0.0, gemini_latency=0.0, astrosage_latency=0.0, weather_latency=0.0,
+                 latency_per_1k_prompt_tokens=0.0, latency_per_1k_completion_tokens=0.0, host="127.0.0.1"):
+        self.host = host
+        self.configs = {
+            "groq": UpstreamConfig(groq_latency, latency_per_1k_prompt_tokens, latency_per_1k_completion_tokens),
+            "gemini": UpstreamConfig(gemini_latency, latency_per_1k_prompt_tokens, latency_per_1k_completion_tokens),
+            "astrosage": UpstreamConfig(astrosage_latency),
+            "openweathermap": UpstreamConfig(weather_latency),
+        }
+        self.servers = {}
+        self._threads = []
+
+    def start(self, ports=None):
+        ports = ports or {}
+        for name, handler in self.HANDLERS.items():
+            handler_class = type(handler.__name__, (handler,), {"config": self.configs[name]})
+            server = ThreadingHTTPServer((self.host, ports.get(name, 0)), handler_class)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True)
+            thread.start()
+            self.servers[name] = server
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def url(self, name):
+        return f"http://{self.host}:{self.servers[name].server_address[1]}"
+
+    def environ(self):
+        """Environment variables that point the backend's clients at these servers."""
+        return {
+            "GROQ_API_KEY": "fake-groq-key",
+            "GROQ_API_BASE": self.url("groq"),   # langchain-groq
+            "GROQ_BASE_URL": self.url("groq"),   # groq SDK
+            "GOOGLE_API_KEY": "fake-google-key",
+            "GEMINI_API_ENDPOINT": self.url("gemini"),
+            "ASTROSAGE_BASE_URL": self.url("astrosage"),
+            "OPENWEATHER_API_KEY": "fake-weather-key",
+            "OPENWEATHER_BASE_URL": self.url("openweathermap"),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for the backend's upstream services.")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="Seconds added to every Groq call.")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Seconds added to every Gemini call.")
+    parser.add_argument("--astrosage-latency", type=float, default=0.3)
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--latency-per-1k-prompt-tokens", type=float, default=0.0,
+                        help="Extra seconds per 1,000 prompt tokens on LLM calls.")
+    parser.add_argument("--latency-per-1k-completion-tokens", type=float, default=0.0,
+                        help="Extra seconds per 1,000 completion tokens on LLM calls.")
+    parser.add_argument("--base-port", type=int, default=18080,
+                        help="Groq, Gemini, astrosage and OpenWeatherMap listen on consecutive ports from here.")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.groq_latency, args.gemini_latency, args.astrosage_latency,
+                              args.weather_latency, args.latency_per_1k_prompt_tokens,
+                              args.latency_per_1k_completion_tokens)
+    upstreams.start({name: args.base_port + offset for offset, name in enumerate(FakeUpstreams.HANDLERS)})
+    print("Fake upstreams running. Export these before starting the backend:")
+    for key, value in upstreams.environ().items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
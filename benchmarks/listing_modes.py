@@ -0,0 +1,125 @@
+# listing_modes.py
+# Compares the two product listing pipelines of POST /api/listing/:
+#   - two_stage:   a Gemini vision call describes the image, then one Groq call per content part
+#   - single_pass: one multimodal Gemini call writes every selected content part
+# Reports LLM calls, prompt/completion tokens per upstream, estimated cost and latency per
+# listing, using the fake upstreams (whose latency grows with prompt and completion size)
+# or, with --live, the real Groq/Gemini APIs configured in the environment.
+#
+# Run with: python -m benchmarks.listing_modes --requests 10
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+MODES = ("two_stage", "single_pass")
+# Content option sets to compare, from a single part to the full listing
+OPTION_SETS = {
+    "seo": {"seo": True},
+    "all": {"seo": True, "whatsapp": True, "conversational": True},
+}
+
+
+def _sample_png():
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (512, 512), (230, 120, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _tokens(upstreams):
+    """{upstream: (prompt, completion)} from the fakes; live runs only have the endpoint's total."""
+    if upstreams:
+        return {name: (upstreams.configs[name].prompt_tokens, upstreams.configs[name].completion_tokens)
+                for name in ("groq", "gemini")}
+    from backend.metrics import LLM_TOKENS
+    return {"total": (LLM_TOKENS.get(endpoint="listing", kind="prompt"),
+                      LLM_TOKENS.get(endpoint="listing", kind="completion"))}
+
+
+async def compare(requests, prices, upstreams):
+    import httpx
+
+    from backend.main import app
+    from backend.metrics import collect_timeline
+
+    png = _sample_png()
+    print(f"{'options':>8}{'mode':>13}{'calls':>7}{'groq in/out':>15}{'gemini in/out':>15}{'total in/out':>15}"
+          f"{'$/1k listings':>15}{'mean ms':>10}{'p50 ms':>9}{'errors':>8}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        for options_name, options in OPTION_SETS.items():
+            for mode in MODES:
+                before = _tokens(upstreams)
+                latencies, calls, errors = [], 0, 0
+                for i in range(requests):
+                    start = time.perf_counter()
+                    with collect_timeline() as timeline:
+                        response = await client.post(
+                            "/api/listing/",
+                            data={"description": f"Pink cotton anarkali kurti {i}", "category": "Kurtis",
+                                  "mode": mode, "content_options_str": json.dumps(options)},
+                            files={"image": ("kurti.png", png, "image/png")},
+                        )
+                    latencies.append(time.perf_counter() - start)
+                    calls += sum(name in ("upstream.groq", "upstream.gemini") for name, _, _ in timeline)
+                    errors += response.status_code != 200
+                after = _tokens(upstreams)
+                delta = {name: [(a - b) / requests for a, b in zip(after[name], before[name])] for name in after}
+                total = [sum(value[0] for value in delta.values()), sum(value[1] for value in delta.values())]
+                if upstreams:
+                    cost = sum(delta[name][0] * prices[name][0] + delta[name][1] * prices[name][1]
+                               for name in delta) / 1e6 * 1000
+                    cost = f"{cost:.3f}"
+                else:
+                    cost = "n/a"  # Live token totals are not split by upstream
+                groq, gemini = delta.get("groq", (0, 0)), delta.get("gemini", (0, 0))
+                print(f"{options_name:>8}{mode:>13}{calls / requests:>7.1f}"
+                      f"{f'{groq[0]:.0f}/{groq[1]:.0f}':>15}{f'{gemini[0]:.0f}/{gemini[1]:.0f}':>15}"
+                      f"{f'{total[0]:.0f}/{total[1]:.0f}':>15}{cost:>15}"
+                      f"{statistics.fmean(latencies) * 1000:>10.0f}{statistics.median(latencies) * 1000:>9.0f}"
+                      f"{errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the two-stage and single-pass listing pipelines.")
+    parser.add_argument("--requests", type=int, default=10, help="Listings per options set and mode.")
+    parser.add_argument("--live", action="store_true",
+                        help="Call the real APIs configured in the environment instead of the fake upstreams.")
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    parser.add_argument("--gemini-latency", type=float, default=0.6)
+    parser.add_argument("--latency-per-1k-prompt-tokens", type=float, default=0.1,
+                        help="Fake upstream latency added per 1,000 prompt tokens.")
+    parser.add_argument("--latency-per-1k-completion-tokens", type=float, default=2.0,
+                        help="Fake upstream latency added per 1,000 completion tokens.")
+    # USD per million tokens (input, output); adjust to the models and plan in use
+    parser.add_argument("--groq-price", type=lambda s: tuple(map(float, s.split("/"))), default=(0.20, 0.20),
+                        help="Groq input/output price per 1M tokens, e.g. 0.20/0.20.")
+    parser.add_argument("--gemini-price", type=lambda s: tuple(map(float, s.split("/"))), default=(0.075, 0.30),
+                        help="Gemini input/output price per 1M tokens, e.g. 0.075/0.30.")
+    args = parser.parse_args()
+
+    upstreams = None
+    if not args.live:
+        upstreams = FakeUpstreams(groq_latency=args.groq_latency, gemini_latency=args.gemini_latency,
+                                  latency_per_1k_prompt_tokens=args.latency_per_1k_prompt_tokens,
+                                  latency_per_1k_completion_tokens=args.latency_per_1k_completion_tokens).start()
+        os.environ.update(upstreams.environ())
+    os.environ["CACHE_WARMER"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    try:
+        asyncio.run(compare(args.requests, {"groq": args.groq_price, "gemini": args.gemini_price}, upstreams))
+    finally:
+        if upstreams:
+            upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# load_test.py
+# Offline load driver for the backend routers. Starts the fake upstreams, points the
+# backend at them, then drives the app in-process at each concurrency level and reports
+# throughput, latency percentiles and how long the event loop was blocked.
+#
+# Run with: python -m benchmarks.load_test --concurrency 1,8,32 --requests 64
+#
+# Because the app runs on the driver's own event loop, any synchronous work in a
+# request handler shows up as event-loop blocking time.
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+
+# --- Event Loop Lag Monitor ---
+class LoopLagMonitor:
+    """Sleeps in short ticks and accumulates how late each tick wakes up."""
+
+    def __init__(self, interval=0.005, threshold=0.001):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked_seconds = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            if lag > self.threshold:
+                self.blocked_seconds += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+# --- Scenarios ---
+def _sample_png():
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), (230, 120, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def build_scenarios(unique_keys=False):
+    """
+    Maps a scenario name to a coroutine factory that issues one request with an httpx client.
+    With unique_keys, every request uses a distinct location/text so cached results are never reused.
+    """
+    png = _sample_png()
+
+    def location(i):
+        return f"Delhi {i}" if unique_keys else "Delhi"
+
+    listing_content = {
+        "category": "Kurtis",
+        "seo_content": {"title": "Cotton Kurti", "description": "A breathable cotton kurti.",
+                        "tags": ["kurti"], "keywords": ["cotton kurti"]},
+    }
+
+    async def chat(client, i):
+        return await client.post("/api/chat/", data={"current_query": f"What should I stock for Diwali? ({i})",
+                                                      "language": "english", "history_str": "[]"})
+
+    async def planner(client, i):
+        return await client.get("/api/planner/full-report", params={"location": location(i)})
+
+    async def trends(client, i):
+        return await client.get("/api/trends/full-trends-report", params={"location": location(i), "category": "Kurtis"})
+
+    async def listing(client, i, mode="two_stage"):
+        return await client.post(
+            "/api/listing/",
+            data={"description": "Pink cotton anarkali kurti", "category": "Kurtis", "mode": mode,
+                  "content_options_str": json.dumps({"seo": True, "whatsapp": True, "conversational": True})},
+            files={"image": ("kurti.png", png, "image/png")},
+        )
+
+    async def listing_single_pass(client, i):
+        return await listing(client, i, mode="single_pass")
+
+    async def listing_improve(client, i):
+        return await client.post("/api/listing/improve", json={"content": listing_content})
+
+    async def listing_translate(client, i):
+        content = dict(listing_content, seo_content=dict(listing_content["seo_content"], title=f"Cotton Kurti {i}")) \
+            if unique_keys else listing_content
+        return await client.post("/api/listing/translate", json={"content": content, "language": "Hindi"})
+
+    return {"chat": chat, "planner": planner, "trends": trends, "listing": listing,
+            "listing_single_pass": listing_single_pass, "listing_improve": listing_improve,
+            "listing_translate": listing_translate}
+
+
+# --- Driver ---
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_level(client, scenario, concurrency, total_requests, first_index=0):
+    """
+    Issues total_requests requests with at most `concurrency` in flight and returns stats.
+    Requests are numbered from first_index, so levels given disjoint ranges never share cache keys.
+    """
+    latencies, errors = [], 0
+    next_index = iter(range(first_index, first_index + total_requests))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "rps": total_requests / elapsed if elapsed else float("inf"),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else float("nan"),
+        "loop_blocked_ms": monitor.blocked_seconds * 1000,
+        "loop_max_lag_ms": monitor.max_lag * 1000,
+    }
+
+
+def print_table(name, rows):
+    columns = ["concurrency", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "loop_blocked_ms",
+               "loop_max_lag_ms"]
+    print(f"\n== {name} ==")
+    print("  ".join(f"{column:>15}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{row[column]:>15.1f}" if isinstance(row[column], float) else f"{row[column]:>15}"
+                        for column in columns))
+
+
+async def main_async(args):
+    import httpx
+
+    upstreams = FakeUpstreams(args.groq_latency, args.gemini_latency, args.astrosage_latency,
+                              args.weather_latency, args.latency_per_1k_prompt_tokens).start()
+    os.environ.update(upstreams.environ())
+    os.environ["CACHE_BACKEND"] = args.cache_backend
+    # Keep per-request log records out of the results table
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    fake_redis = None
+    if args.cache_backend == "redis":
+        from benchmarks.fake_redis import FakeRedis
+        fake_redis = FakeRedis().start()
+        os.environ["REDIS_URL"] = fake_redis.url
+    elif args.cache_backend == "sqlite":
+        import tempfile
+        os.environ["CACHE_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "benchmark-cache.sqlite3")
+
+    # Import only after the environment points at the fakes and the chosen cache backend.
+    from backend.main import app
+
+    scenarios = build_scenarios(args.unique_keys)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        for name in args.scenarios:
+            rows = []
+            for level, concurrency in enumerate(args.concurrency):
+                rows.append(await run_level(client, scenarios[name], concurrency, args.requests,
+                                            first_index=level * args.requests))
+            results[name] = rows
+            print_table(name, rows)
+
+    upstreams.stop()
+    if fake_redis:
+        fake_redis.stop()
+    print("\nUpstream calls:", {name: config.requests for name, config in upstreams.configs.items()})
+    print("Upstream tokens (prompt/completion):",
+          {name: (config.prompt_tokens, config.completion_tokens) for name, config in upstreams.configs.items()
+           if config.prompt_tokens})
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=1)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the AI Co-pilot backend.")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","),
+                        default=["chat", "planner", "trends", "listing"],
+                        help="Comma-separated subset of: chat, planner, trends, listing, listing_single_pass, "
+                             "listing_improve, listing_translate.")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--groq-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=0.4)
+    parser.add_argument("--astrosage-latency", type=float, default=0.1)
+    parser.add_argument("--weather-latency", type=float, default=0.05)
+    parser.add_argument("--latency-per-1k-prompt-tokens", type=float, default=0.0)
+    parser.add_argument("--cache-backend", choices=["memory", "sqlite", "redis"], default="memory",
+                        help="Cache backend to run the app with; 'redis' starts a local fake Redis server.")
+    parser.add_argument("--unique-keys", action="store_true",
+                        help="Use a distinct location/text per request so every request misses the cache.")
+    parser.add_argument("--json", help="Optional path to write the raw results as JSON.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
@@ -0,0 +1,86 @@
+# planner_batch.py
+# Compares fetching planner reports for many locations with N separate
+# /api/planner/full-report requests (sent concurrently, as an aggregator would)
+# against one /api/planner/batch-report request. Reports total LLM calls,
+# prompt/completion tokens and wall-clock time, using the fake upstreams
+# (whose latency grows with prompt size).
+#
+# Run with: python -m benchmarks.planner_batch --locations 12
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+
+async def run(location_count, batch_sizes, upstreams):
+    import httpx
+
+    import backend.planner_routes as planner_routes
+    from backend.main import app
+    from backend.metrics import LLM_TOKENS
+
+    def tokens():
+        return {kind: sum(LLM_TOKENS.get(endpoint=endpoint, kind=kind) for endpoint in ("planner", "planner_batch"))
+                for kind in ("prompt", "completion")}
+
+    async def measure(label, call):
+        groq = upstreams.configs["groq"]
+        before, calls_before = tokens(), groq.requests
+        start = time.perf_counter()
+        errors = await call()
+        elapsed = time.perf_counter() - start
+        after = tokens()
+        print(f"{label:>16}{groq.requests - calls_before:>11}{after['prompt'] - before['prompt']:>15.0f}"
+              f"{after['completion'] - before['completion']:>19.0f}{elapsed * 1000:>11.0f}{errors:>8}")
+
+    print(f"{'mode':>16}{'LLM calls':>11}{'prompt tokens':>15}{'completion tokens':>19}{'wall ms':>11}{'errors':>8}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        # Unique location names per mode so every report misses the cache
+        async def separate():
+            responses = await asyncio.gather(*(
+                client.get("/api/planner/full-report", params={"location": f"City {i} single"})
+                for i in range(location_count)))
+            return sum(response.status_code != 200 for response in responses)
+        await measure("separate", separate)
+
+        for batch_size in batch_sizes:
+            planner_routes.PLANNER_BATCH_SIZE = batch_size
+
+            async def batched():
+                response = await client.post("/api/planner/batch-report", json={
+                    "locations": [f"City {i} batch{batch_size}" for i in range(location_count)]})
+                if response.status_code != 200:
+                    return location_count
+                body = response.json()
+                return len(body["errors"]) + location_count - len(body["reports"])
+            await measure(f"batch of {batch_size}", batched)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate planner requests with one batch request.")
+    parser.add_argument("--locations", type=int, default=12)
+    parser.add_argument("--batch-sizes", default="1,3,6", help="Comma-separated PLANNER_BATCH_SIZE values to try.")
+    parser.add_argument("--groq-latency", type=float, default=0.5)
+    parser.add_argument("--latency-per-1k-prompt-tokens", type=float, default=0.25,
+                        help="Fake upstream latency added per 1,000 prompt tokens.")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(groq_latency=args.groq_latency,
+                              latency_per_1k_prompt_tokens=args.latency_per_1k_prompt_tokens).start()
+    os.environ.update(upstreams.environ())
+    os.environ["CACHE_WARMER"] = "0"
+    # Keep per-request log records out of the results table
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    try:
+        asyncio.run(run(args.locations, batch_sizes, upstreams))
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# prompt_size.py
+# Compares LangChain's full JSON Schema format instructions with the compact
+# TypeScript-style instructions from backend.schema_prompt:
+#   1. size of the instructions per model (characters and estimated tokens)
+#   2. end-to-end prompt tokens and latency of the planner, trends and listing routes
+#      in each mode, using the fake upstreams (whose latency grows with prompt size)
+#      or, with --live, the real Groq/Gemini APIs configured in the environment.
+#
+# Run with: python -m benchmarks.prompt_size --requests 5
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreams, estimate_tokens
+
+MODES = {"full": "0", "compact": "1"}
+ENDPOINTS = ("planner", "trends", "listing")
+
+
+def instruction_sizes():
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    from backend.planner_routes import PlannerAIResponse
+    from backend.product_listing_routes import ConversationalContent, SEOContent, WhatsAppContent
+    from backend.schema_prompt import compact_format_instructions
+    from backend.trends_routes import TrendsResponse
+
+    print(f"{'model':>24}{'full chars':>12}{'full ~tok':>11}{'compact chars':>15}{'compact ~tok':>14}{'saved':>8}")
+    for model in (PlannerAIResponse, TrendsResponse, SEOContent, WhatsAppContent, ConversationalContent):
+        full = PydanticOutputParser(pydantic_object=model).get_format_instructions()
+        compact = compact_format_instructions(model)
+        print(f"{model.__name__:>24}{len(full):>12}{estimate_tokens(full):>11}{len(compact):>15}"
+              f"{estimate_tokens(compact):>14}{1 - len(compact) / len(full):>8.0%}")
+
+
+async def end_to_end(requests):
+    import httpx
+    from PIL import Image
+
+    from backend.main import app
+    from backend.metrics import LLM_TOKENS
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), (230, 120, 160)).save(buffer, format="PNG")
+    png = buffer.getvalue()
+
+    async def call(client, endpoint, tag):
+        # Unique locations/descriptions so every request misses the report cache
+        if endpoint == "planner":
+            return await client.get("/api/planner/full-report", params={"location": f"Delhi {tag}"})
+        if endpoint == "trends":
+            return await client.get("/api/trends/full-trends-report", params={"location": f"Delhi {tag}"})
+        return await client.post(
+            "/api/listing/",
+            data={"description": f"Pink cotton anarkali kurti {tag}", "category": "Kurtis",
+                  "content_options_str": json.dumps({"seo": True, "whatsapp": True, "conversational": True})},
+            files={"image": ("kurti.png", png, "image/png")},
+        )
+
+    print(f"\n{'endpoint':>10}{'mode':>9}{'prompt tok/req':>16}{'completion tok/req':>20}{'mean ms':>10}{'p50 ms':>9}{'errors':>8}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        for endpoint in ENDPOINTS:
+            for mode, flag in MODES.items():
+                os.environ["COMPACT_SCHEMA_PROMPTS"] = flag
+                prompt_before = LLM_TOKENS.get(endpoint=endpoint, kind="prompt")
+                completion_before = LLM_TOKENS.get(endpoint=endpoint, kind="completion")
+                latencies, errors = [], 0
+                for i in range(requests):
+                    start = time.perf_counter()
+                    response = await call(client, endpoint, f"{mode}-{i}")
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code >= 400
+                prompt = (LLM_TOKENS.get(endpoint=endpoint, kind="prompt") - prompt_before) / requests
+                completion = (LLM_TOKENS.get(endpoint=endpoint, kind="completion") - completion_before) / requests
+                print(f"{endpoint:>10}{mode:>9}{prompt:>16.0f}{completion:>20.0f}"
+                      f"{statistics.fmean(latencies) * 1000:>10.0f}{statistics.median(latencies) * 1000:>9.0f}{errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and compact structured-output instructions.")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per endpoint and mode.")
+    parser.add_argument("--live", action="store_true",
+                        help="Call the real APIs configured in the environment instead of the fake upstreams.")
+    parser.add_argument("--groq-latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-1k-prompt-tokens", type=float, default=0.25,
+                        help="Fake upstream latency added per 1,000 prompt tokens.")
+    args = parser.parse_args()
+
+    upstreams = None
+    if not args.live:
+        upstreams = FakeUpstreams(groq_latency=args.groq_latency, gemini_latency=args.groq_latency,
+                                  latency_per_1k_prompt_tokens=args.latency_per_1k_prompt_tokens).start()
+        os.environ.update(upstreams.environ())
+    # Keep per-request log records out of the results table
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    instruction_sizes()
+    asyncio.run(end_to_end(args.requests))
+    if upstreams:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# startup_benchmark.py
+# Measures cold-start cost of the backend in fresh interpreter processes:
+#   - import-time profile (python -X importtime) of `backend.main`, top modules by cumulative time
+#   - wall time to import the app, answer the first health check, and serve the first real
+#     /api/chat request (which needs LangChain and Groq) against the fake upstreams
+# for three startup paths:
+#   - eager: every heavy SDK is loaded before serving, which is what importing the routers
+#     cost before clients were made lazy
+#   - lazy: SDKs are imported by the first request that needs them (WARMUP_ON_STARTUP=0)
+#   - lazy + warm-up: SDKs are imported in a background thread after startup (the default)
+# The first chat request is sent right after the health check, or --first-request-delay
+# seconds later to model traffic arriving some time after the instance becomes ready.
+#
+# Run with: python -m benchmarks.startup_benchmark --runs 5
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+# Executed in a fresh interpreter; prints a JSON line with timings in seconds.
+_PROBE = """
+import asyncio, json, time
+import httpx
+start = time.perf_counter()
+import backend.main
+imported = time.perf_counter()
+if {eager!r}:
+    from backend.clients import warm_up
+    warm_up()
+ready = time.perf_counter()
+
+async def serve():
+    app = backend.main.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup", timeout=120) as client:
+            await client.get("/")
+            healthy = time.perf_counter()
+            await asyncio.sleep({delay!r})
+            sent = time.perf_counter()
+            response = await client.post("/api/chat/", data={{"current_query": "What should I stock for Diwali?",
+                                                              "language": "english", "history_str": "[]"}})
+            return healthy, sent, time.perf_counter(), response.status_code
+
+healthy, sent, served, status = asyncio.run(serve())
+print(json.dumps({{"import": imported - start, "ready": ready - start, "health": healthy - start,
+                  "first_chat": served - sent, "first_chat_done": served - start, "status": status}}))
+"""
+MODES = (
+    # (label, load SDKs before serving, WARMUP_ON_STARTUP)
+    ("eager", True, "0"),
+    ("lazy", False, "0"),
+    ("lazy + warm-up", False, "1"),
+)
+COLUMNS = ("import", "ready", "health", "first_chat", "first_chat_done")
+
+
+def _environ(upstreams=None, warmup="1"):
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark-key")
+    env.setdefault("GOOGLE_API_KEY", "benchmark-key")
+    if upstreams:
+        env.update(upstreams.environ())
+        env.update(WARMUP_ON_STARTUP=warmup, CACHE_WARMER="0", LOOP_LAG_MONITOR="0", LOG_LEVEL="WARNING")
+    return env
+
+
+def measure(eager, warmup, runs, delay, upstreams):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(eager=eager, delay=delay)],
+                                capture_output=True, text=True, env=_environ(upstreams, warmup), check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        if sample["status"] != 200:
+            raise RuntimeError(f"First chat request failed with HTTP {sample['status']}")
+        samples.append(sample)
+    return {key: statistics.median(sample[key] for sample in samples) for key in COLUMNS}
+
+
+def import_profile(eager, top):
+    """Returns the `top` slowest modules by cumulative import time as (microseconds, module)."""
+    code = "import backend.main"
+    if eager:
+        code += "; from backend.clients import import_heavy_modules; import_heavy_modules()"
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            env=_environ(), check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only top-level entries of each import tree (no leading indentation in the original line)
+        if not line.split("|")[2].startswith("  "):
+            rows.append((int(cumulative), module))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the AI Co-pilot backend.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode (median is reported).")
+    parser.add_argument("--top", type=int, default=10, help="Modules to show in the import-time profile.")
+    parser.add_argument("--first-request-delay", type=float, default=0.0,
+                        help="Seconds between the health check and the first chat request.")
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    for label, eager in (("lazy (current)", False), ("eager (all SDKs at startup)", True)):
+        print(f"\n== Import-time profile: {label} ==")
+        for cumulative, module in import_profile(eager, args.top):
+            print(f"{cumulative / 1000:>10.1f} ms  {module}")
+
+    upstreams = FakeUpstreams(groq_latency=args.groq_latency).start()
+    try:
+        results = {label: measure(eager, warmup, args.runs, args.first_request_delay, upstreams)
+                   for label, eager, warmup in MODES}
+    finally:
+        upstreams.stop()
+
+    print(f"\n== Startup timings (median of {args.runs} runs, seconds; "
+          f"first chat sent {args.first_request_delay:g}s after the health check) ==")
+    print(f"{'':>16}{'import app':>12}{'ready':>8}{'health check':>14}{'first chat':>12}{'first chat done':>17}")
+    for label, result in results.items():
+        print(f"{label:>16}{result['import']:>12.3f}{result['ready']:>8.3f}{result['health']:>14.3f}"
+              f"{result['first_chat']:>12.3f}{result['first_chat_done']:>17.3f}")
+    print("\n'first chat' is the latency of the first /api/chat request, including any SDK import it waits for;\n"
+          "'first chat done' is measured from process start.")
+
+
+if __name__ == "__main__":
+    main()
@@ -91,8 +91,9 @@ const Dashboard = () => {
         }
         console.log(`Checking profile for user UID: ${currentUser.uid}`);
         try {
-            await databases.getDocument(APPWRITE_DB_ID, APPWRITE_PROFILES_COLLECTION_ID, currentUser.uid);
+            const profile = await databases.getDocument(APPWRITE_DB_ID, APPWRITE_PROFILES_COLLECTION_ID, currentUser.uid);
             console.log("User profile found. User is not new.");
+            startSession(profile);
         } catch (error) {
             console.error("Error checking user profile:", error);
             if (error.code === 404) {
@@ -104,6 +105,21 @@ const Dashboard = () => {
         }
     };
 
+    // Ask the backend to start generating the planner and trends reports in the background,
+    // so they are cached by the time the seller opens those pages. Fire-and-forget.
+    // Reports are for the seller's location and main (first) category; Delhi if none is set.
+    const startSession = (profile) => {
+        const body = { location: profile.location?.trim() || 'Delhi' };
+        if (profile.categories?.length) {
+            body.category = profile.categories[0];
+        }
+        fetch(`${backendURL}/api/session/start`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body),
+        }).catch((err) => console.error("Failed to start report prefetch:", err));
+    };
+
     const fetchUserProducts = async (currentUser) => {
         if (!currentUser) {
             setProducts([]);
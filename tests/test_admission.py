@@ -0,0 +1,108 @@
+# test_admission.py
+# Bulkhead slot accounting: FIFO handoff on release, rejection when the queue is full or a
+# request waits too long, and cancelled waiters.
+#
+# Run with: python -m pytest tests
+
+import asyncio
+
+from backend.admission import Bulkhead
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_release_hands_the_slot_to_the_longest_waiting_request():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=2, queue_timeout=1)
+        assert await bulkhead.acquire()
+        order = []
+
+        async def wait(name):
+            assert await bulkhead.acquire()
+            order.append(name)
+
+        waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await _settle()
+        assert bulkhead.active == 1 and len(bulkhead._waiters) == 2
+
+        bulkhead.release()
+        await _settle()
+        assert order == ["first"] and bulkhead.active == 1
+        bulkhead.release()
+        await _settle()
+        assert order == ["first", "second"] and bulkhead.active == 1
+        bulkhead.release()
+        assert bulkhead.active == 0
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=1)
+        assert await bulkhead.acquire()
+        waiter = asyncio.create_task(bulkhead.acquire())
+        await _settle()
+        assert not await bulkhead.acquire()
+        bulkhead.release()
+        assert await waiter
+        bulkhead.release()
+        assert bulkhead.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiting_past_the_queue_timeout_is_rejected():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        assert await bulkhead.acquire()
+        assert not await bulkhead.acquire()
+        assert len(bulkhead._waiters) == 0 and bulkhead.active == 1
+        bulkhead.release()
+        assert bulkhead.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_take_the_slot_of_one_still_waiting():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=2, queue_timeout=1)
+        assert await bulkhead.acquire()
+        cancelled = asyncio.create_task(bulkhead.acquire())
+        waiting = asyncio.create_task(bulkhead.acquire())
+        await _settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        bulkhead.release()
+        assert await waiting
+        assert bulkhead.active == 1 and len(bulkhead._waiters) == 0
+        bulkhead.release()
+        assert bulkhead.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_after_the_handoff_does_not_leak_the_slot():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=1)
+        assert await bulkhead.acquire()
+        waiter = asyncio.create_task(bulkhead.acquire())
+        await _settle()
+        # The slot is handed over, but the waiter is cancelled before it resumes
+        bulkhead.release()
+        waiter.cancel()
+        (result,) = await asyncio.gather(waiter, return_exceptions=True)
+        # Depending on the Python version, wait_for either raises the cancellation (and the
+        # slot is given back) or completes the handoff (and the caller owns the slot)
+        if result is True:
+            assert bulkhead.active == 1
+            bulkhead.release()
+        assert bulkhead.active == 0
+        assert await bulkhead.acquire()
+
+    asyncio.run(scenario())
@@ -0,0 +1,119 @@
+# test_cache.py
+# Single-flight and cancellation behaviour of Cache.get_or_set, and the SQLite backend's
+# atomic `add`, which backs the cross-process regeneration lock.
+#
+# Run with: python -m pytest tests
+
+import asyncio
+import time
+
+from backend.cache import Cache, MemoryBackend, SQLiteBackend
+
+
+class Factory:
+    """Counts calls and returns a value after `delay` seconds, or raises `error`."""
+
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return {"value": self.calls}
+
+
+def test_concurrent_misses_share_one_computation():
+    async def scenario():
+        cache, factory = Cache(MemoryBackend()), Factory()
+        results = await asyncio.gather(*(cache.get_or_set("k", factory, 60) for _ in range(5)))
+        assert results == [{"value": 1}] * 5
+        assert factory.calls == 1
+        assert await cache.get("k") == {"value": 1}
+        assert cache._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_fail_other_waiters():
+    async def scenario():
+        cache, factory = Cache(MemoryBackend()), Factory(delay=0.1)
+        first = asyncio.create_task(cache.get_or_set("k", factory, 60))
+        second = asyncio.create_task(cache.get_or_set("k", factory, 60))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        assert await second == {"value": 1}
+        assert first.cancelled()
+        assert factory.calls == 1 and factory.cancelled == 0
+
+    asyncio.run(scenario())
+
+
+def test_last_cancelled_waiter_cancels_the_computation():
+    async def scenario():
+        cache, factory = Cache(MemoryBackend()), Factory(delay=0.1)
+        only = asyncio.create_task(cache.get_or_set("k", factory, 60))
+        await asyncio.sleep(0.02)
+        only.cancel()
+        await asyncio.gather(only, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert factory.cancelled == 1
+        assert cache._inflight == {}
+        # A later caller starts a fresh computation instead of joining the cancelled one
+        assert await cache.get_or_set("k", factory, 60) == {"value": 2}
+
+    asyncio.run(scenario())
+
+
+def test_factory_error_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        cache, factory = Cache(MemoryBackend()), Factory(error=ValueError("upstream failed"))
+        results = await asyncio.gather(*(cache.get_or_set("k", factory, 60) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert factory.calls == 1
+        assert await cache.get("k") is None
+        assert cache._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_add_is_exclusive_until_expiry(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    # Two connections to one file stand in for two worker processes
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+    try:
+        assert first._add("lock:k", b"a", 0.2)
+        assert not second._add("lock:k", b"b", 0.2)
+        assert second._get("lock:k") == b"a"
+        time.sleep(0.25)
+        # An expired lock can be taken over
+        assert second._add("lock:k", b"b", 0.2)
+        assert first._get("lock:k") == b"b"
+    finally:
+        first._conn.close()
+        second._conn.close()
+
+
+def test_workers_sharing_sqlite_regenerate_once(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "cache.sqlite3")
+        workers = [Cache(SQLiteBackend(path), poll_interval=0.01) for _ in range(2)]
+        factory = Factory(delay=0.1)
+        try:
+            results = await asyncio.gather(*(worker.get_or_set("k", factory, 60) for worker in workers))
+            assert results == [{"value": 1}] * 2
+            assert factory.calls == 1
+        finally:
+            for worker in workers:
+                await worker.close()
+
+    asyncio.run(scenario())
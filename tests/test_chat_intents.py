@@ -0,0 +1,65 @@
+# test_chat_intents.py
+# Routing table for the local chat intent router: which phrasings are answered from
+# local data, and which must reach the LLM.
+#
+# Run with: python -m pytest tests
+
+import asyncio
+
+import pytest
+
+from backend.chat_intents import classify_intent, route_query
+
+ROUTES = [
+    # Answered locally
+    ("What is today's date?", ("date", {})),
+    ("aaj ki tarikh kya hai", ("date", {})),
+    ("which season is it", ("season", {})),
+    ("How is the weather today?", ("weather", {})),
+    ("मौसम कैसा है", ("weather", {})),
+    ("is today a holiday?", ("festival_today", {})),
+    ("aaj koi tyohaar hai?", ("festival_today", {})),
+    ("upcoming festivals", ("festivals_days", {"days": 30})),
+    ("which festivals are in the next 10 days", ("festivals_days", {"days": 10})),
+    ("agle hafte kaun se tyohaar hain", ("festivals_days", {"days": 7})),
+    ("may I know upcoming festivals", ("festivals_days", {"days": 30})),
+    ("festivals in may", ("festivals_month", {"month": 5, "year": None})),
+    ("list of festivals in March", ("festivals_month", {"month": 3, "year": None})),
+    ("मई में कौन से त्योहार हैं", ("festivals_month", {"month": 5, "year": None})),
+    ("When is Diwali?", ("festival_date", {"name": "divali", "year": None, "is_date_question": False})),
+    ("holi kab hai", ("festival_date", {"name": "holi", "year": None, "is_date_question": False})),
+    ("when is diwali 2027", ("festival_date", {"name": "divali", "year": 2027, "is_date_question": False})),
+    ("Diwali 2027 kab hai", ("festival_date", {"name": "divali", "year": 2027, "is_date_question": False})),
+    ("festivals in november 2027", ("festivals_month", {"month": 11, "year": 2027})),
+    # Sent to the LLM
+    ("best festival for jewellery", None),
+    ("festival offers on kurtis", None),
+    ("which festival has the highest returns", None),
+    ("festival discount kitna dena chahiye", None),
+    ("festivals", None),
+    ("What should I stock for Diwali?", None),
+    ("weather in Mumbai", None),
+    ("what is the best season for sarees", None),
+    ("list festivals of 2027", None),
+    ("what is the date in 2027", None),
+    ("weather in 2027", None),
+]
+
+
+@pytest.mark.parametrize("query, expected", ROUTES)
+def test_classify_intent(query, expected):
+    assert classify_intent(query) == expected
+
+
+# Answered from the bundled festival snapshot, which covers these years
+ANSWERS = [
+    ("when is diwali 2027", "english", "2027"),
+    ("Diwali 2027 kab hai", "hinglish", "2027"),
+    ("festivals in november 2027", "english", "in November 2027"),
+]
+
+
+@pytest.mark.parametrize("query, language, expected", ANSWERS)
+def test_named_year_is_answered_for_that_year(query, language, expected):
+    reply = asyncio.run(route_query(query, language))
+    assert reply is not None and expected in reply
@@ -0,0 +1,103 @@
+# test_circuit_breaker.py
+# Circuit breaker state changes: opening on the failure rate, the half-open probe closing
+# or reopening the circuit, and calls from an earlier window that finish late.
+#
+# Run with: python -m pytest tests
+
+import time
+
+import pytest
+
+from backend.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+def _breaker(**overrides):
+    options = dict(slow_call_seconds=1.0, failure_rate_threshold=0.5, window_size=4, min_calls=4,
+                   open_seconds=0.05)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def _trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(breaker.before_call(), False)
+    assert breaker.state == OPEN
+
+
+def _wait_until_half_open(breaker):
+    time.sleep(breaker.open_seconds + 0.01)
+
+
+def test_opens_once_the_failure_rate_crosses_the_threshold():
+    breaker = _breaker()
+    for success in (True, True, False):
+        breaker.record(breaker.before_call(), success)
+    # Too few calls to judge yet
+    assert breaker.state == CLOSED
+    breaker.record(breaker.before_call(), False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker(slow_call_seconds=0.0)
+    for _ in range(breaker.min_calls):
+        with breaker.call():
+            time.sleep(0.001)
+    assert breaker.state == OPEN
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = _breaker()
+    _trip(breaker)
+    _wait_until_half_open(breaker)
+    probe = breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = _breaker()
+    _trip(breaker)
+    _wait_until_half_open(breaker)
+    breaker.record(breaker.before_call(), False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_call_from_the_earlier_window_does_not_decide_the_probe():
+    breaker = _breaker()
+    stale = [breaker.before_call() for _ in range(2)]
+    _trip(breaker)
+    _wait_until_half_open(breaker)
+    probe = breaker.before_call()
+
+    # Slow calls admitted while the circuit was closed finish during the probe
+    breaker.record(stale[0], True)
+    assert breaker.state == HALF_OPEN
+    breaker.record(stale[1], False)
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+    # ...and don't count towards the new closed window either
+    breaker.record(stale[0], False)
+    assert list(breaker._outcomes) == []
+
+
+def test_cancelled_probe_frees_its_slot():
+    breaker = _breaker()
+    _trip(breaker)
+    _wait_until_half_open(breaker)
+    cancelled = breaker.before_call()
+    breaker.cancel(cancelled)
+    probe = breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
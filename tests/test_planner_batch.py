@@ -0,0 +1,72 @@
+# test_planner_batch.py
+# The batch planner endpoint shares the single-report regeneration lock: a location that is
+# already being generated elsewhere is awaited, not generated a second time in a batch.
+#
+# Run with: python -m pytest tests
+
+import asyncio
+
+from backend import http_cache, planner_routes
+from backend.cache import Cache, MemoryBackend
+from backend.planner_routes import PlannerBatchRequest, PlannerResponse, planner_cache_key
+
+EMPTY_REPORT = PlannerResponse(upcomingFestivals=[], topProductsToStock=[], nearbyDemand=[], avoidProducts=[],
+                               aiRecommendations=[])
+
+
+def _patch(monkeypatch, cache, generated):
+    async def festival_context(endpoint):
+        return [], "No festivals listed."
+
+    async def generate_batch(locations, festival_entries, real_festivals):
+        generated.append(("batch", list(locations)))
+        return {location: EMPTY_REPORT for location in locations}
+
+    async def generate_single(location):
+        generated.append(("single", location))
+        await asyncio.sleep(0.1)
+        return EMPTY_REPORT
+
+    monkeypatch.setattr(planner_routes, "get_cache", lambda: cache)
+    monkeypatch.setattr(http_cache, "get_cache", lambda: cache)
+    monkeypatch.setattr(planner_routes, "get_festival_context", festival_context)
+    monkeypatch.setattr(planner_routes, "generate_planner_batch", generate_batch)
+    monkeypatch.setattr(planner_routes, "generate_planner_report", generate_single)
+
+
+def test_batch_skips_a_location_a_single_report_is_generating(monkeypatch):
+    async def scenario():
+        cache, generated = Cache(MemoryBackend(), poll_interval=0.01), []
+        _patch(monkeypatch, cache, generated)
+        single = asyncio.create_task(planner_routes.get_planner_report_entry("Mumbai"))
+        await asyncio.sleep(0.02)
+
+        response = await planner_routes.get_batch_planner_report(PlannerBatchRequest(locations=["Delhi", "Mumbai"]))
+        assert sorted(response.reports) == ["Delhi", "Mumbai"]
+        assert generated == [("single", "Mumbai"), ("batch", ["Delhi"])]
+        await single
+        # The batch released the lock it took for Delhi
+        assert await cache.get(f"lock:{planner_cache_key('Delhi')}") is None
+
+    asyncio.run(scenario())
+
+
+def test_batch_skips_a_location_another_worker_holds_the_lock_for(monkeypatch):
+    async def scenario():
+        cache, generated = Cache(MemoryBackend(), poll_interval=0.01), []
+        _patch(monkeypatch, cache, generated)
+        # Another worker is generating Mumbai and stores it shortly
+        assert await cache.try_lock(planner_cache_key("Mumbai"), "other-worker")
+
+        async def other_worker():
+            await asyncio.sleep(0.05)
+            await cache.set(planner_cache_key("Mumbai"), http_cache.make_entry(EMPTY_REPORT.model_dump()), 60)
+            await cache.unlock(planner_cache_key("Mumbai"), "other-worker")
+
+        worker = asyncio.create_task(other_worker())
+        response = await planner_routes.get_batch_planner_report(PlannerBatchRequest(locations=["Delhi", "Mumbai"]))
+        assert sorted(response.reports) == ["Delhi", "Mumbai"]
+        assert generated == [("batch", ["Delhi"])]
+        await worker
+
+    asyncio.run(scenario())